@@ -1,13 +1,13 @@
 import streamlit as st
 
-from streamlit_pages import generate_audio, generate_video, list_audio_templates, list_files, list_video_templates, upload_files
+from streamlit_pages import generate_audio, generate_video, list_audio_templates, list_files, list_video_templates, performance_page, upload_files
 
 
 
 # Main function to switch between pages
 def main():
     st.sidebar.title("Content Builder")
-    page = st.sidebar.radio("Select a page", ["Generate Audio", "Generate Video", "List Generated Files", "Upload Templates", "List Audio Templates", "List Video Templates"])
+    page = st.sidebar.radio("Select a page", ["Generate Audio", "Generate Video", "List Generated Files", "Upload Templates", "List Audio Templates", "List Video Templates", "Performance"])
 
     if page == "Generate Audio":
         generate_audio()
@@ -21,6 +21,8 @@ def main():
         list_audio_templates()
     elif page == "List Video Templates":
         list_video_templates()
+    elif page == "Performance":
+        performance_page()
 
 if __name__ == "__main__":
     main()
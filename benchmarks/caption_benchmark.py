@@ -0,0 +1,120 @@
+"""
+Compare caption rendering strategies for create_video_with_audio.
+
+Features:
+- Builds a synthetic template video and narration with ffmpeg.
+- Times the pre-rasterized ffmpeg overlay path (render_captioned_video).
+- Times a naive MoviePy path that draws the caption with PIL on every frame.
+- Prints the results as JSON.
+
+Usage:
+    python benchmarks/caption_benchmark.py --durations 10 30 --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from moviepy.editor import AudioFileClip, VideoFileClip
+from PIL import Image, ImageDraw
+
+from captions import find_caption_font, load_font, wrap_text
+from functions import CAPTION_FONT_DIVISOR, get_ffmpeg_binary, render_captioned_video
+
+CAPTION = 'Albert Einstein says "Life is like riding a bicycle. To keep your balance you must keep moving."\nहिंदी में\n"जीवन साइकिल चलाने जैसा है।"'
+
+
+def make_fixtures(directory, duration):
+    """
+    Create a 4-second template video and a narration of the given duration.
+
+    Parameters:
+    directory (str): Directory for the fixture files.
+    duration (float): Narration duration in seconds.
+
+    Returns:
+    tuple: (video_path, audio_path).
+    """
+    video_path = os.path.join(directory, "template.mp4")
+    audio_path = os.path.join(directory, f"narration_{duration}.mp3")
+    ffmpeg = get_ffmpeg_binary()
+    if not os.path.exists(video_path):
+        subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc=d=4:s=1280x720:r=30",
+                        "-c:v", "libx264", "-pix_fmt", "yuv420p", video_path], check=True)
+    subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=f=220:d={duration}",
+                    audio_path], check=True)
+    return video_path, audio_path
+
+
+def render_per_frame(video_path, audio_path, output_path):
+    """
+    Naive reference: draw the caption with PIL on every decoded frame through MoviePy.
+
+    Parameters:
+    video_path (str): Path to the template video.
+    audio_path (str): Path to the narration.
+    output_path (str): Path of the rendered video.
+
+    Returns:
+    str: output_path.
+    """
+    audio_clip = AudioFileClip(audio_path)
+    video_clip = VideoFileClip(video_path).loop(duration=audio_clip.duration).set_audio(audio_clip)
+    font_size = max(16, video_clip.h // CAPTION_FONT_DIVISOR)
+    font = load_font(find_caption_font(), font_size)
+    block = "\n".join(wrap_text(CAPTION, font, int(video_clip.w * 0.9)))
+
+    def draw_caption(frame):
+        image = Image.fromarray(frame)
+        draw = ImageDraw.Draw(image)
+        draw.multiline_text((image.width // 2, int(image.height * 0.8)), block, font=font,
+                            fill=(255, 255, 255), anchor="ms", align="center")
+        return np.asarray(image)
+
+    video_clip.fl_image(draw_caption).write_videofile(
+        output_path, codec="libx264", audio_codec="aac", preset="veryfast", logger=None
+    )
+    return output_path
+
+
+def time_call(func, *args):
+    """
+    Time one call of func in seconds.
+    """
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+    Run the benchmark and print the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--durations", type=float, nargs="+", default=[10, 30], help="Narration lengths in seconds.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per strategy and duration.")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for duration in args.durations:
+            video_path, audio_path = make_fixtures(directory, duration)
+            output_path = os.path.join(directory, "out.mp4")
+            for name, func in (("overlay", lambda: render_captioned_video(video_path, audio_path, output_path, [CAPTION])),
+                               ("per_frame", lambda: render_per_frame(video_path, audio_path, output_path))):
+                timings = [time_call(func) for _ in range(args.repeat)]
+                results.append({"strategy": name, "duration": duration, "seconds": timings, "best": min(timings)})
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+    json.dump({"benchmark": "captions", "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Report the cold-start import time of the app shell and check it against a budget.
+
+Features:
+- Imports the target module in a fresh interpreter with `python -X importtime`.
+- Reports the cumulative import time of each top-level module or package in milliseconds.
+- Fails (exit status 1) if the total goes over the budget or a heavy dependency is imported eagerly.
+
+Usage:
+    python benchmarks/import_time.py --budget-ms 1000
+    python benchmarks/import_time.py --module cli --top 20 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 1000
+# Dependencies that only the pages or stages using them may import
+LAZY_MODULES = ["numpy", "pydub", "moviepy", "selenium", "webdriver_manager", "englisttohindi", "PIL",
+                "fake_useragent", "requests"]
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(module):
+    """
+    Import a module in a fresh interpreter and collect its import times.
+
+    Parameters:
+    module (str): Module to import, e.g. "app".
+
+    Returns:
+    tuple: (dict of top-level module → cumulative milliseconds, total milliseconds).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        milliseconds = int(cumulative) / 1000
+        # Nested imports are indented further; only outermost entries add up to the total
+        if not name[1:].startswith(" "):
+            total += milliseconds
+        name = name.strip()
+        # Report top-level modules and packages (where they were first imported), not their submodules
+        if "." not in name and not name.startswith("_"):
+            modules[name] = modules.get(name, 0) + milliseconds
+    return modules, total
+
+
+def eager_modules(module, names):
+    """
+    Find which of the given modules are loaded by importing a module.
+
+    Parameters:
+    module (str): Module to import.
+    names (list): Top-level module names that should not be loaded.
+
+    Returns:
+    list: Names that were loaded.
+    """
+    code = f"import sys, json, {module}; print(json.dumps([n for n in {names!r} if n in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    """
+    Print the import-time report and check the budget.
+
+    Returns:
+    int: Exit status, 1 if the budget or the lazy-import rule is violated.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app", help="Module to import (default: app).")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Maximum total import time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts to measure; the fastest one is reported.")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules to list.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    runs = [measure_imports(args.module) for _ in range(max(1, args.repeat))]
+    modules, total = min(runs, key=lambda run: run[1])
+    eager = eager_modules(args.module, LAZY_MODULES)
+    top = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    if args.json:
+        json.dump({
+            "module": args.module,
+            "total_ms": round(total, 1),
+            "budget_ms": args.budget_ms,
+            "modules_ms": {name: round(ms, 1) for name, ms in top},
+            "eager_heavy_modules": eager,
+        }, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for name, ms in top:
+            print(f"{ms:10.1f} ms  {name}")
+        print(f"{total:10.1f} ms  total (budget {args.budget_ms:.0f} ms)")
+        if eager:
+            print(f"Imported eagerly: {', '.join(eager)}")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"Import time {total:.0f} ms is over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    if eager:
+        print(f"Heavy modules imported at startup: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+Time the pipeline stages offline against local stand-ins for the external services.
+
+Features:
+- Starts a local HTTP server that mimics the ZenQuotes batch endpoint and the crikk TTS page
+  (promptText / action_submit / audioSource elements and the MP3 download).
+- Replaces the EngtoHindi translator with a local stand-in with configurable latency.
+- Generates synthetic narration, background and template fixtures with ffmpeg.
+- Times get_quote, translate_to_hindi, get_audio_data, merge_audio and create_video_with_audio
+  at several input sizes and prints the results as JSON.
+- Runs in a scratch directory, so caches and metadata of the working copy are never touched.
+- A stage that raises is reported with a "failed" entry and the other stages still run;
+  the exit status is then non-zero.
+
+get_audio_data needs Chromium and chromedriver; pass --chromedriver when webdriver_manager cannot
+download one. The stage is reported as skipped if no browser can be started.
+
+Usage:
+    python benchmarks/stage_benchmark.py --durations 5 30 120 --repeat 3 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+SPEECH_CHARS_PER_SECOND = 15  # synthetic speech length per character of text
+WORDS = ("life is like riding a bicycle to keep your balance you must keep moving "
+         "the only way to do great work is to love what you do").split()
+
+TTS_PAGE = """<!DOCTYPE html>
+<html><body>
+<textarea id="promptText"></textarea>
+<button id="action_submit" onclick="synthesize()">Generate</button>
+<audio controls><source id="audioSource" src=""></audio>
+<script>
+var requests = 0;
+function synthesize() {
+  var chars = document.getElementById('promptText').value.length;
+  requests += 1;
+  setTimeout(function () {
+    // A relative src: get_audio_data must match the resolved URL, not the raw attribute
+    document.getElementById('audioSource').setAttribute(
+      'src', '/app/app/text-to-speech/' + requests + '.mp3?chars=' + chars);
+  }, LATENCY_MS);
+}
+</script>
+</body></html>
+"""
+
+
+def make_text(chars):
+    """
+    Build an English text of roughly the given length.
+    """
+    words = []
+    while len(" ".join(words)) < chars:
+        words.append(WORDS[len(words) % len(WORDS)])
+    return " ".join(words).capitalize() + "."
+
+
+def ffmpeg_binary():
+    """
+    Get the ffmpeg binary used by the app.
+    """
+    from functions import get_ffmpeg_binary
+
+    return get_ffmpeg_binary()
+
+
+def make_tone(path, seconds, frequency=220):
+    """
+    Write a sine tone MP3 of the given length (a stand-in for speech or music).
+    """
+    subprocess.run([ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi",
+                    "-i", f"sine=f={frequency}:d={seconds}", "-ac", "2", path], check=True)
+    return path
+
+
+def make_template(path, seconds=4, size="720x1280"):
+    """
+    Write a synthetic video template.
+    """
+    subprocess.run([ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc=d={seconds}:s={size}:r=30",
+                    "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "30", path], check=True)
+    return path
+
+
+class StubServer:
+    """
+    Local stand-in for the ZenQuotes API and the crikk TTS page.
+
+    Parameters:
+    directory (str): Directory for generated MP3 responses.
+    tts_latency (float): Seconds the fake TTS page takes before publishing the audio URL.
+    quotes_per_batch (int): Quotes returned per batch request.
+    """
+
+    def __init__(self, directory, tts_latency=0.5, quotes_per_batch=50):
+        self.directory = directory
+        self.tts_latency = tts_latency
+        self.quotes_per_batch = quotes_per_batch
+        self.requests = {"quotes": 0, "page": 0, "audio": 0}
+        self._batches = 0
+        self._audio = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def quote_batch(self):
+        with self._lock:
+            self._batches += 1
+            batch = self._batches
+        return [{"q": f"{make_text(40 + 7 * (n % 10))} ({batch}-{n})", "a": f"Author {n % 7}"}
+                for n in range(self.quotes_per_batch)]
+
+    def audio_file(self, chars):
+        seconds = max(1, round(chars / SPEECH_CHARS_PER_SECOND))
+        with self._lock:
+            if seconds not in self._audio:
+                self._audio[seconds] = make_tone(os.path.join(self.directory, f"speech_{seconds}.mp3"), seconds, 440)
+            return self._audio[seconds]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/api/quotes":
+                    stub.requests["quotes"] += 1
+                    self._send(200, "application/json", json.dumps(stub.quote_batch()).encode())
+                elif url.path == "/text-to-speech/hindi/":
+                    stub.requests["page"] += 1
+                    page = TTS_PAGE.replace("LATENCY_MS", str(int(stub.tts_latency * 1000)))
+                    self._send(200, "text/html; charset=utf-8", page.encode())
+                elif url.path.startswith("/app/app/text-to-speech/"):
+                    stub.requests["audio"] += 1
+                    chars = int(parse_qs(url.query).get("chars", ["100"])[0])
+                    with open(stub.audio_file(chars), "rb") as f:
+                        self._send(200, "audio/mpeg", f.read())
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+        return Handler
+
+
+def install_translator_stand_in(latency):
+    """
+    Replace the EngtoHindi translator with a local stand-in.
+
+    Parameters:
+    latency (float): Seconds each translation takes, like a network round trip.
+    """
+    class EngtoHindi:
+        def __init__(self, text):
+            time.sleep(latency)
+            self.convert = f"[hi] {text}"
+
+    module = types.ModuleType("englisttohindi.englisttohindi")
+    module.EngtoHindi = EngtoHindi
+    package = types.ModuleType("englisttohindi")
+    package.englisttohindi = module
+    sys.modules["englisttohindi"] = package
+    sys.modules["englisttohindi.englisttohindi"] = module
+
+
+def time_calls(func, repeat):
+    """
+    Call func `repeat` times and return the durations in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def result(stage, size, unit, timings, **extra):
+    """
+    Build one JSON result record.
+    """
+    record = {
+        "stage": stage,
+        "size": size,
+        "unit": unit,
+        "seconds": [round(t, 4) for t in timings],
+        "first": round(timings[0], 4),
+        "best": round(min(timings), 4),
+        "median": round(statistics.median(timings), 4),
+    }
+    record.update(extra)
+    print(json.dumps(record), file=sys.stderr)
+    return record
+
+
+def bench_quotes(stub, counts, repeat):
+    import quote_source
+    from functions import get_quote
+
+    results = []
+    for count in counts:
+        timings = []
+        for _ in range(repeat):
+            # A fresh buffer per run, so every run pays for its batch requests
+            quote_source._quote_buffer = quote_source.QuoteBuffer(url=f"{stub.url}/api/quotes")
+            before = stub.requests["quotes"]
+            start = time.perf_counter()
+            for _ in range(count):
+                get_quote()
+            timings.append(time.perf_counter() - start)
+        results.append(result("get_quote", count, "quotes", timings, batch_requests=stub.requests["quotes"] - before))
+    return results
+
+
+def bench_translate(lengths, repeat):
+    from functions import translate_to_hindi
+
+    results = []
+    for chars in lengths:
+        text = make_text(chars) + f" {time.time_ns()}"
+        # The first call misses the cache; the rest are served from it
+        timings = time_calls(lambda: translate_to_hindi(text), repeat + 1)
+        results.append(result("translate_to_hindi", chars, "chars", timings, cache_miss_seconds=round(timings[0], 4)))
+    return results
+
+
+def bench_tts(stub, lengths, repeat, chromedriver):
+    import functions
+
+    functions.TTS_PAGE_URLS = {"in": f"{stub.url}/text-to-speech/hindi/"}
+    functions.TTS_AUDIO_URL_PREFIX = f"{stub.url}/app/app/text-to-speech/"
+    if chromedriver:
+        functions._chromedriver_path = chromedriver
+    try:
+        driver = functions.init_driver()
+    except Exception as e:
+        reason = str(e).strip().splitlines()[0] if str(e).strip() else e.__class__.__name__
+        print(f"Skipping get_audio_data: {reason}", file=sys.stderr)
+        return [{"stage": "get_audio_data", "skipped": reason}]
+
+    results = []
+    try:
+        for chars in lengths:
+            text = make_text(chars)
+            stage_timings = []
+
+            def synthesize():
+                timings = {}
+                if not functions.get_audio_data(text, driver, timings=timings):
+                    raise RuntimeError("get_audio_data returned nothing")
+                stage_timings.append(timings)
+
+            timings = time_calls(synthesize, repeat)
+            results.append(result(
+                "get_audio_data", chars, "chars", timings,
+                tts_latency=stub.tts_latency,
+                wait_seconds=round(statistics.median(t["wait_seconds"] for t in stage_timings), 4),
+                download_seconds=round(statistics.median(t["download_seconds"] for t in stage_timings), 4),
+                driver_ready_seconds=next((round(t["driver_ready_seconds"], 4) for t in stage_timings
+                                           if "driver_ready_seconds" in t), None),
+            ))
+    finally:
+        driver.quit()
+    return results
+
+
+def bench_merge(directory, durations, repeat):
+    from functions import merge_audio
+
+    background = make_tone(os.path.join(directory, "background.mp3"), 60, 110)
+    results = []
+    for seconds in durations:
+        narration = make_tone(os.path.join(directory, f"narration_{seconds}.mp3"), seconds)
+        output_dir = os.path.join(directory, "merged")
+        # The first run decodes the background into the PCM cache; later runs reuse it
+        timings = time_calls(lambda: merge_audio(narration, output_dir=output_dir, background_audio_path=background),
+                             repeat)
+        results.append(result("merge_audio", seconds, "seconds", timings))
+    return results
+
+
+def bench_render(directory, durations, repeat):
+    from functions import create_video_with_audio
+
+    template = make_template(os.path.join(directory, "template.mp4"))
+    results = []
+    for seconds in durations:
+        narration = make_tone(os.path.join(directory, f"narration_{seconds}.mp3"), seconds)
+        output = os.path.join(directory, "render.mp4")
+        for captions in ([], [make_text(120)]):
+            timings = time_calls(lambda: create_video_with_audio(template, narration, output, captions), repeat)
+            results.append(result("create_video_with_audio", seconds, "seconds", timings, captions=bool(captions)))
+    return results
+
+
+def run_stage(stage, bench, *args):
+    """
+    Run one stage's benchmark, recording a failure instead of aborting the whole run.
+    """
+    try:
+        return bench(*args)
+    except Exception as e:
+        reason = f"{e.__class__.__name__}: {e}"
+        print(f"{stage} failed: {reason}", file=sys.stderr)
+        return [{"stage": stage, "failed": reason}]
+
+
+def git_commit():
+    """
+    Get the commit being benchmarked, None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    """
+    Run the benchmarks and print (or write) the results as JSON.
+    """
+    stages = ["get_quote", "translate_to_hindi", "get_audio_data", "merge_audio", "create_video_with_audio"]
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=stages, default=stages, help="Stages to time.")
+    parser.add_argument("--quote-counts", type=int, nargs="+", default=[1, 10, 50], help="Quotes fetched per run.")
+    parser.add_argument("--text-lengths", type=int, nargs="+", default=[50, 200, 800],
+                        help="Characters of text translated and synthesized.")
+    parser.add_argument("--durations", type=float, nargs="+", default=[5, 30, 120],
+                        help="Narration lengths in seconds for mixing and rendering.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage and size.")
+    parser.add_argument("--tts-latency", type=float, default=0.5, help="Seconds the fake TTS page takes.")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="Seconds the fake translator takes.")
+    parser.add_argument("--chromedriver", help="Path to chromedriver, instead of resolving it with webdriver_manager.")
+    parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    install_translator_stand_in(args.translate_latency)
+    output = os.path.abspath(args.output) if args.output else None
+    working_dir = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # Caches, metadata and outputs go to the scratch directory
+        os.chdir(directory)
+        try:
+            fixtures = os.path.join(directory, "fixtures")
+            os.makedirs(fixtures)
+            with StubServer(fixtures, tts_latency=args.tts_latency) as stub:
+                if "get_quote" in args.stages:
+                    results += run_stage("get_quote", bench_quotes, stub, args.quote_counts, args.repeat)
+                if "translate_to_hindi" in args.stages:
+                    results += run_stage("translate_to_hindi", bench_translate, args.text_lengths, args.repeat)
+                if "get_audio_data" in args.stages:
+                    results += run_stage("get_audio_data", bench_tts, stub, args.text_lengths, args.repeat,
+                                         args.chromedriver)
+            if "merge_audio" in args.stages:
+                results += run_stage("merge_audio", bench_merge, fixtures, args.durations, args.repeat)
+            if "create_video_with_audio" in args.stages:
+                results += run_stage("create_video_with_audio", bench_render, fixtures, args.durations, args.repeat)
+        finally:
+            # Leave the scratch directory before it is removed
+            os.chdir(working_dir)
+
+    report = {
+        "benchmark": "stages",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 1 if any("failed" in record for record in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,562 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+CACHE_DIR = "cache"
+TRANSLATION_CACHE_FILE = os.path.join(CACHE_DIR, "translations.sqlite3")
+TRANSLATION_MEMORY_ENTRIES = 512
+TRANSLATION_MAX_ENTRIES = 50000
+TRANSLATION_MAX_AGE = 90 * 24 * 3600  # seconds
+TRANSLATION_TOUCH_BATCH = 50  # memory hits whose last_used is written back to disk in one go
+TTS_CACHE_DIR = os.path.join(CACHE_DIR, "tts")
+TTS_CACHE_MAX_BYTES = 500 * 1024 * 1024
+PCM_CACHE_DIR = os.path.join(CACHE_DIR, "pcm")
+PCM_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # about 60 decoded three-minute stereo tracks
+
+
+def normalize_text(text):
+    """
+    Normalize text before hashing it into a cache key.
+
+    Features:
+    - Applies Unicode NFC normalization and collapses whitespace.
+
+    Parameters:
+    text (str): The text to normalize.
+
+    Returns:
+    str: Normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(*parts):
+    """
+    Build a content-addressed cache key.
+
+    Parameters:
+    parts (str): Values that together identify the cached content.
+
+    Returns:
+    str: SHA-256 hex digest of the parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """
+    Persistent translation cache with an in-process LRU in front of it.
+
+    Features:
+    - Stores translations in SQLite keyed by a hash of the normalized source text.
+    - Keeps recently used translations in memory; memory hits are written back to the disk
+      last_used in batches, and whenever an entry drops out of memory or a translation is stored.
+    - Evicts entries older than `max_age` seconds and the least recently used
+      entries beyond `max_entries`.
+    - Counts memory hits, disk hits and misses.
+
+    Parameters:
+    path (str): Path to the SQLite database file.
+    memory_entries (int): Number of translations kept in memory.
+    max_entries (int): Maximum number of translations kept on disk.
+    max_age (int): Maximum age of a stored translation in seconds.
+    """
+
+    def __init__(self, path=TRANSLATION_CACHE_FILE, memory_entries=TRANSLATION_MEMORY_ENTRIES,
+                 max_entries=TRANSLATION_MAX_ENTRIES, max_age=TRANSLATION_MAX_AGE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()  # key → (translated, created_at)
+        self._touched = {}  # key → last_used of memory hits not yet written to disk
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, source TEXT, translated TEXT, "
+            "created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            evicted, _ = self._memory.popitem(last=False)
+            if evicted in self._touched:
+                self._flush_touches()
+
+    def _flush_touches(self):
+        # The caller commits
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def get(self, text):
+        """
+        Look up a cached translation.
+
+        Parameters:
+        text (str): The source text.
+
+        Returns:
+        str: Cached translation, or None on a miss.
+        """
+        key = text_key(normalize_text(text))
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                translated, created_at = self._memory[key]
+                if now - created_at > self.max_age:
+                    del self._memory[key]
+                    self._touched.pop(key, None)
+                    self.stats["misses"] += 1
+                    return None
+                self._memory.move_to_end(key)
+                self._touched[key] = now
+                if len(self._touched) >= TRANSLATION_TOUCH_BATCH:
+                    self._flush_touches()
+                    self._conn.commit()
+                self.stats["memory_hits"] += 1
+                return translated
+
+            row = self._conn.execute(
+                "SELECT translated, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.stats["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self._conn.commit()
+            self.stats["disk_hits"] += 1
+            return row[0]
+
+    def put(self, text, translated):
+        """
+        Store a translation and apply the eviction policy.
+
+        Parameters:
+        text (str): The source text.
+        translated (str): The translated text.
+
+        Returns:
+        None
+        """
+        source = normalize_text(text)
+        key = text_key(source)
+        now = time.time()
+        with self._lock:
+            # Write pending hits first, so the eviction below sees the real last_used order
+            self._touched.pop(key, None)
+            self._flush_touches()
+            self._remember(key, translated, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, source, translated, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, source, translated, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM translations WHERE created_at < ?", (now - self.max_age,))
+        self._conn.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class TTSCache:
+    """
+    On-disk cache of synthesized speech.
+
+    Features:
+    - Stores MP3 bytes in files named by a hash of (text, language, backend).
+    - Keeps the total size under a byte budget, evicting least recently used files first.
+    - Counts hits and misses.
+
+    Parameters:
+    directory (str): Directory holding the cached MP3 files.
+    max_bytes (int): Byte budget for the whole cache.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def path_for(self, text, lang, backend):
+        """
+        Get the cache file path for a TTS request.
+
+        Parameters:
+        text (str): The text that was synthesized.
+        lang (str): Language code.
+        backend (str): Name of the TTS backend.
+
+        Returns:
+        str: Path of the cache file (which may not exist).
+        """
+        # Keyed on the exact text: line breaks change how the TTS service paces speech
+        return os.path.join(self.directory, text_key(text, lang, backend) + ".mp3")
+
+    def get(self, text, lang, backend):
+        """
+        Look up cached speech.
+
+        Parameters:
+        text (str): The text that was synthesized.
+        lang (str): Language code.
+        backend (str): Name of the TTS backend.
+
+        Returns:
+        bytes: Cached MP3 data, or None on a miss.
+        """
+        path = self.path_for(text, lang, backend)
+        with self._lock:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self.stats["misses"] += 1
+                return None
+            # The modification time doubles as the LRU timestamp
+            os.utime(path)
+            self.stats["hits"] += 1
+            return data
+
+    def put(self, text, lang, backend, audio_data):
+        """
+        Store synthesized speech and enforce the byte budget.
+
+        Parameters:
+        text (str): The text that was synthesized.
+        lang (str): Language code.
+        backend (str): Name of the TTS backend.
+        audio_data (bytes): MP3 data.
+
+        Returns:
+        str: Path of the cache file.
+        """
+        path = self.path_for(text, lang, backend)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio_data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._evict()
+        return path
+
+    def copy_to(self, text, lang, backend, dest_path):
+        """
+        Copy cached speech to a file.
+
+        Parameters:
+        text (str): The text that was synthesized.
+        lang (str): Language code.
+        backend (str): Name of the TTS backend.
+        dest_path (str): Path to copy the MP3 file to.
+
+        Returns:
+        bool: True on a cache hit, False on a miss.
+        """
+        path = self.path_for(text, lang, backend)
+        with self._lock:
+            try:
+                shutil.copyfile(path, dest_path)
+            except FileNotFoundError:
+                self.stats["misses"] += 1
+                return False
+            os.utime(path)
+            self.stats["hits"] += 1
+            return True
+
+    def put_file(self, text, lang, backend, src_path):
+        """
+        Store speech from an existing MP3 file and enforce the byte budget.
+
+        Parameters:
+        text (str): The text that was synthesized.
+        lang (str): Language code.
+        backend (str): Name of the TTS backend.
+        src_path (str): Path of the MP3 file to copy into the cache.
+
+        Returns:
+        str: Path of the cache file.
+        """
+        path = self.path_for(text, lang, backend)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._evict()
+        return path
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".mp3"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 of a file's contents.
+
+    Parameters:
+    path (str): Path to the file.
+    chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+    str: SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PCMCache:
+    """
+    Cache of decoded audio tracks stored as memory-mapped NumPy arrays.
+
+    Features:
+    - Decodes each track once and stores 16-bit PCM as `.npy`, keyed by the file's content hash.
+    - Re-hashes a file only when its size or modification time changes.
+    - Stores resampled/remixed variants separately so conversions also happen once.
+    - Writes arrays and their `.json` sidecars atomically; an unreadable entry is treated as a miss.
+    - Keeps the arrays under a byte budget, evicting least recently used ones first.
+
+    Parameters:
+    directory (str): Directory holding the cached arrays.
+    max_bytes (int): Byte budget for all cached arrays.
+    """
+
+    def __init__(self, directory=PCM_CACHE_DIR, max_bytes=PCM_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._hashes = {}
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def _hash(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = file_hash(path)
+        self._hashes[path] = (signature, digest)
+        return digest
+
+    def _save(self, key, samples, frame_rate):
+        import numpy as np
+
+        path = os.path.join(self.directory, key + ".npy")
+        tmp_path = os.path.join(self.directory, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp.npy")
+        np.save(tmp_path, samples)
+        os.replace(tmp_path, path)
+        # The sidecar goes last and atomically, so a reader that finds it also finds the complete array
+        info_path = os.path.join(self.directory, key + ".json")
+        tmp_info_path = f"{info_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_info_path, "w") as f:
+            json.dump({"frame_rate": frame_rate, "channels": samples.shape[1]}, f)
+        os.replace(tmp_info_path, info_path)
+
+    def _load(self, key):
+        import numpy as np
+
+        path = os.path.join(self.directory, key + ".npy")
+        info_path = os.path.join(self.directory, key + ".json")
+        if key not in self._arrays:
+            try:
+                with open(info_path, "r") as f:
+                    info = json.load(f)
+                self._arrays[key] = (np.load(path, mmap_mode="r"), info["frame_rate"])
+            except (OSError, ValueError, KeyError):
+                # Missing, evicted or written by an older version; decode again
+                return None
+        try:
+            # The modification time doubles as the LRU timestamp
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another process; the memory map stays valid
+        return self._arrays[key]
+
+    def _evict(self, keep=()):
+        # keep: keys in use by the current load, never evicted even if they alone exceed the budget
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".npy") and ".tmp" not in entry.name:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            key = os.path.basename(path)[:-len(".npy")]
+            if key in keep:
+                continue
+            self._arrays.pop(key, None)
+            for old in (path, os.path.join(self.directory, key + ".json")):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass  # already gone, or still mapped on Windows
+            total -= size
+
+    def info(self, path):
+        """
+        Get the native format of a track, decoding it if it is not cached yet.
+
+        Parameters:
+        path (str): Path to the audio file.
+
+        Returns:
+        tuple: (frame_rate, channels) of the decoded track.
+        """
+        samples, frame_rate = self.load(path)
+        return frame_rate, samples.shape[1]
+
+    def load(self, path, frame_rate=None, channels=None):
+        """
+        Load the decoded PCM of a track.
+
+        Features:
+        - Returns a read-only memory map; nothing is decoded on a cache hit.
+
+        Parameters:
+        path (str): Path to the audio file.
+        frame_rate (int): Target frame rate, None for the native rate.
+        channels (int): Target channel count, None for the native count.
+
+        Returns:
+        tuple: (int16 array of shape (frames, channels), frame_rate).
+        """
+        # numpy and pydub are only needed once audio is actually mixed
+        import numpy as np
+        from pydub import AudioSegment
+
+        with self._lock:
+            digest = self._hash(path)
+            native = self._load(digest)
+            if native is None:
+                segment = AudioSegment.from_file(path).set_sample_width(2)
+                samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+                self._save(digest, samples, segment.frame_rate)
+                self._evict(keep=(digest,))
+                native = self._load(digest)
+
+            native_samples, native_rate = native
+            frame_rate = frame_rate or native_rate
+            channels = channels or native_samples.shape[1]
+            if (frame_rate, channels) == (native_rate, native_samples.shape[1]):
+                return native
+
+            key = f"{digest}-{frame_rate}-{channels}"
+            variant = self._load(key)
+            if variant is None:
+                segment = AudioSegment(
+                    data=np.ascontiguousarray(native_samples).tobytes(),
+                    sample_width=2,
+                    frame_rate=native_rate,
+                    channels=native_samples.shape[1],
+                ).set_frame_rate(frame_rate).set_channels(channels)
+                samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, channels)
+                self._save(key, samples, frame_rate)
+                self._evict(keep=(digest, key))
+                variant = self._load(key)
+            return variant
+
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """
+    Get the process-wide translation cache.
+
+    Returns:
+    TranslationCache: Shared translation cache instance.
+    """
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache()
+        return _translation_cache
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """
+    Get the process-wide TTS cache.
+
+    Returns:
+    TTSCache: Shared TTS cache instance.
+    """
+    global _tts_cache
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            _tts_cache = TTSCache()
+        return _tts_cache
+
+
+_pcm_cache = None
+_pcm_cache_lock = threading.Lock()
+
+
+def get_pcm_cache():
+    """
+    Get the process-wide decoded audio cache.
+
+    Returns:
+    PCMCache: Shared PCM cache instance.
+    """
+    global _pcm_cache
+    with _pcm_cache_lock:
+        if _pcm_cache is None:
+            _pcm_cache = PCMCache()
+        return _pcm_cache
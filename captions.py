@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+
+from PIL import Image, ImageDraw, ImageFont, features
+
+from caches import CACHE_DIR, text_key
+
+CAPTION_CACHE_DIR = os.path.join(CACHE_DIR, "captions")
+# First font that exists is used; Noto covers both Latin and Devanagari
+CAPTION_FONT_PATHS = [
+    "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+CAPTION_TEXT_COLOR = (255, 255, 255, 255)
+CAPTION_BOX_COLOR = (0, 0, 0, 160)
+# Scripts that need complex text layout (conjuncts, vowel signs) to render correctly
+COMPLEX_SCRIPT_PATTERN = re.compile("[\u0900-\u097F]")
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+_complex_layout = None
+
+
+def has_complex_layout():
+    """
+    Check whether Pillow can shape complex scripts such as Devanagari.
+
+    Features:
+    - Needs Pillow built with libraqm (libraqm0 and libfribidi0 in packages.txt).
+    - Warns once per process when it cannot.
+
+    Returns:
+    bool: True if the raqm layout engine is available.
+    """
+    global _complex_layout
+    with _fonts_lock:
+        if _complex_layout is None:
+            _complex_layout = bool(features.check("raqm"))
+            if not _complex_layout:
+                print("Warning: Pillow has no raqm layout engine (install libraqm0 and libfribidi0); "
+                      "Hindi caption lines are left out because they would be shaped wrongly.")
+        return _complex_layout
+
+
+def find_caption_font():
+    """
+    Find the font used for captions.
+
+    Returns:
+    str: Path of the first available caption font, None to use PIL's default font.
+    """
+    for path in CAPTION_FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_font(font_path, font_size):
+    """
+    Load a font once per process.
+
+    Parameters:
+    font_path (str): Path to a TrueType font, None for PIL's default font.
+    font_size (int): Font size in pixels.
+
+    Returns:
+    ImageFont.FreeTypeFont: Loaded font.
+    """
+    key = (font_path, font_size)
+    layout_engine = ImageFont.Layout.RAQM if has_complex_layout() else ImageFont.Layout.BASIC
+    with _fonts_lock:
+        if key not in _fonts:
+            if font_path:
+                _fonts[key] = ImageFont.truetype(font_path, font_size, layout_engine=layout_engine)
+            else:
+                _fonts[key] = ImageFont.load_default(font_size)
+        return _fonts[key]
+
+
+def wrap_text(text, font, max_width):
+    """
+    Wrap text into lines that fit a pixel width.
+
+    Features:
+    - Keeps existing line breaks and wraps each paragraph on word boundaries.
+
+    Parameters:
+    text (str): Text to wrap.
+    font (ImageFont.FreeTypeFont): Font used to measure the text.
+    max_width (int): Maximum line width in pixels.
+
+    Returns:
+    list: Wrapped lines.
+    """
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if line and font.getlength(candidate) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def rasterize_caption(text, width, font_size, font_path=None):
+    """
+    Render a caption block to a transparent PNG once and reuse it.
+
+    Features:
+    - Caches the image on disk keyed by text, font, size and width.
+    - Draws wrapped, centred text on a translucent box.
+    - Without complex text layout, leaves out Devanagari lines instead of burning garbled text
+      (unless nothing else is left).
+
+    Parameters:
+    text (str): Caption text.
+    width (int): Maximum width of the caption image in pixels.
+    font_size (int): Font size in pixels.
+    font_path (str): Path to a TrueType font, None to pick one with find_caption_font.
+
+    Returns:
+    str: Path to the RGBA PNG image.
+    """
+    font_path = font_path or find_caption_font()
+    complex_layout = has_complex_layout()
+    if not complex_layout:
+        shapeable = [line for line in text.splitlines() if not COMPLEX_SCRIPT_PATTERN.search(line)]
+        if any(line.strip() for line in shapeable):
+            text = "\n".join(shapeable).strip()
+    os.makedirs(CAPTION_CACHE_DIR, exist_ok=True)
+    # The layout engine is part of the key, so captions drawn without raqm are not reused once it is installed
+    layout = "raqm" if complex_layout else "basic"
+    image_path = os.path.join(
+        CAPTION_CACHE_DIR, text_key(text, font_path or "default", str(font_size), str(width), layout) + ".png"
+    )
+    if os.path.exists(image_path):
+        return image_path
+
+    font = load_font(font_path, font_size)
+    padding = font_size // 2
+    spacing = font_size // 4
+    lines = wrap_text(text, font, width - 2 * padding)
+
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    block = "\n".join(lines)
+    left, top, right, bottom = measure.multiline_textbbox((0, 0), block, font=font, spacing=spacing, align="center")
+    image = Image.new("RGBA", (int(right - left) + 2 * padding, int(bottom - top) + 2 * padding), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle((0, 0, image.width - 1, image.height - 1), radius=padding, fill=CAPTION_BOX_COLOR)
+    draw.multiline_text(
+        (padding - left, padding - top), block, font=font, fill=CAPTION_TEXT_COLOR, spacing=spacing, align="center"
+    )
+
+    tmp_path = f"{image_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, image_path)
+    return image_path
+
+
+def caption_windows(captions_texts, duration):
+    """
+    Split a duration into one display window per caption.
+
+    Features:
+    - Gives each caption time in proportion to its length.
+
+    Parameters:
+    captions_texts (list): Caption texts, in display order.
+    duration (float): Total duration in seconds.
+
+    Returns:
+    list: (start, end) tuples in seconds.
+    """
+    weights = [max(1, len(text)) for text in captions_texts]
+    total = sum(weights)
+    windows = []
+    start = 0.0
+    for weight in weights:
+        end = start + duration * weight / total
+        windows.append((start, end))
+        start = end
+    return windows
@@ -0,0 +1,209 @@
+import argparse
+import contextlib
+import fnmatch
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+from driver_pool import close_driver_pool
+from functions import RENDER_PROFILES
+from pipeline import MERGE_WORKERS, QUOTE_BUDGET, RENDER_WORKERS, build_audio_pipeline
+from quote_source import get_quote_buffer
+from templates import get_template_catalog
+
+# JSON lines go to the real stdout; during a run file descriptor 1 points at stderr, so diagnostic
+# prints of this process, its worker processes and ffmpeg cannot interleave with the records
+_progress_stream = sys.stdout
+
+
+def emit(record):
+    """
+    Write one JSON-lines progress record to stdout.
+
+    Parameters:
+    record (dict): The record to write.
+
+    Returns:
+    None
+    """
+    record.setdefault("time", round(time.time(), 3))
+    _progress_stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    _progress_stream.flush()
+
+
+def select_templates(directory, extension, patterns, count, rule):
+    """
+    Pick one template per quote.
+
+    Features:
+    - Filters templates in a directory by glob patterns.
+    - Assigns them at random or in round-robin order.
+
+    Parameters:
+    directory (str): Template directory.
+    extension (str): File extension of the templates (e.g. ".mp4").
+    patterns (list): Glob patterns matched against file names; empty matches everything.
+    count (int): Number of templates to pick.
+    rule (str): "random" or "round-robin".
+
+    Returns:
+    list: Template paths, one per quote.
+    """
+    files = get_template_catalog().names(directory, extension)
+    if patterns:
+        files = [f for f in files if any(fnmatch.fnmatch(f, pattern) for pattern in patterns)]
+    if not files:
+        raise SystemExit(f"No templates in {directory} match {patterns or ['*']}")
+    paths = [os.path.join(directory, f) for f in files]
+    if rule == "round-robin":
+        return list(itertools.islice(itertools.cycle(paths), count))
+    return [random.choice(paths) for _ in range(count)]
+
+
+def parse_args(argv=None):
+    """
+    Parse the command-line arguments.
+
+    Parameters:
+    argv (list): Arguments to parse, None for sys.argv.
+
+    Returns:
+    argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Generate quote audio and videos without the Streamlit UI.")
+    parser.add_argument("--count", type=int, default=1, help="Number of quotes to generate.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Parallel quote fetches, translations and TTS sessions.")
+    parser.add_argument("--merge-workers", type=int, default=MERGE_WORKERS, help="Worker processes for audio mixing.")
+    parser.add_argument("--render-workers", type=int, default=RENDER_WORKERS, help="Worker processes for video rendering.")
+    parser.add_argument("--audio-template", action="append", default=[], metavar="GLOB",
+                        help="Background audio templates to use (repeatable, matched in audios/).")
+    parser.add_argument("--video-template", action="append", default=[], metavar="GLOB",
+                        help="Video templates to use (repeatable, matched in videos/).")
+    parser.add_argument("--selection", choices=["random", "round-robin"], default="random",
+                        help="How templates are assigned to quotes.")
+    parser.add_argument("--audio-only", action="store_true", help="Stop after mixing the audio.")
+    parser.add_argument("--export-mp3", action="store_true",
+                        help="Also export each lossless mix as an MP3 next to it in output/audios.")
+    parser.add_argument("--quote-budget", type=float, default=QUOTE_BUDGET,
+                        help="Seconds allowed for fetching, translating and synthesizing each quote, "
+                             "split between the stages.")
+    parser.add_argument("--formats", nargs="+", choices=list(RENDER_PROFILES), default=[], metavar="PROFILE",
+                        help=f"Render these formats in one pass ({', '.join(RENDER_PROFILES)}); "
+                             "default is one video in the template's own format.")
+    parser.add_argument("--output-dir", default=os.path.join("output", "videos"), help="Directory for rendered videos.")
+    return parser.parse_args(argv)
+
+
+@contextlib.contextmanager
+def redirect_stdout_fd():
+    """
+    Point file descriptor 1 at stderr and write progress records to a saved copy of the real stdout.
+
+    Features:
+    - Unlike contextlib.redirect_stdout, also covers spawned worker processes and subprocesses,
+      which inherit the redirected descriptor.
+    - Restores stdout afterwards, even if the run raises.
+
+    Returns:
+    None
+    """
+    global _progress_stream
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    os.dup2(2, 1)
+    _progress_stream = os.fdopen(saved_fd, "w", encoding="utf-8")
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        _progress_stream.flush()
+        os.dup2(saved_fd, 1)
+        _progress_stream.close()
+        _progress_stream = sys.stdout
+
+
+def main(argv=None):
+    """
+    Run a batch of quotes through the pipeline and report progress as JSON lines.
+
+    Parameters:
+    argv (list): Arguments to parse, None for sys.argv.
+
+    Returns:
+    int: Exit status, non-zero if any quote failed.
+    """
+    args = parse_args(argv)
+    with redirect_stdout_fd():
+        return run(args)
+
+
+
+def run(args):
+    """
+    Run the batch described by the parsed arguments.
+
+    Parameters:
+    args (argparse.Namespace): Parsed arguments.
+
+    Returns:
+    int: Exit status, non-zero if any quote failed.
+    """
+    start = time.perf_counter()
+
+    backgrounds = select_templates("audios", ".mp3", args.audio_template, args.count, args.selection)
+    items = [{"background_audio_path": path, "quote_budget": args.quote_budget, "export_mp3": args.export_mp3}
+             for path in backgrounds]
+    if not args.audio_only:
+        videos = select_templates("videos", ".mp4", args.video_template, args.count, args.selection)
+        for item, video in zip(items, videos):
+            item.update(video_template_path=video, video_output_dir=args.output_dir, render_profiles=args.formats)
+
+    get_quote_buffer().prefetch(args.count)
+    pipeline = build_audio_pipeline(
+        network_workers=args.concurrency,
+        tts_workers=args.concurrency,
+        merge_workers=args.merge_workers,
+        render_video=not args.audio_only,
+        render_workers=args.render_workers,
+    )
+
+    failures = 0
+    stage_seconds = {}
+    try:
+        for event in pipeline.run(items):
+            record = {"event": event["status"], "index": event["index"], "stage": event["stage"]}
+            if "elapsed" in event:
+                record["seconds"] = round(event["elapsed"], 3)
+                stage_seconds.setdefault(event["stage"], []).append(event["elapsed"])
+            if event["status"] == "failed":
+                failures += 1
+                record["error"] = event["error"]
+            if event["status"] == "completed":
+                item = event["item"]
+                record.update(
+                    quote=item["quote"],
+                    author=item["author"],
+                    audio=item["final_audio_path"],
+                    mp3=item.get("mp3_path"),
+                    video=item.get("final_video_path"),
+                    videos=list(item.get("final_video_paths", {}).values()) or None,
+                )
+            emit(record)
+    finally:
+        close_driver_pool()
+
+    emit({
+        "event": "summary",
+        "count": args.count,
+        "failed": failures,
+        "seconds": round(time.perf_counter() - start, 3),
+        "stage_seconds": {stage: round(sum(values), 3) for stage, values in stage_seconds.items()},
+    })
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+DRIVER_POOL_SIZE = 2  # Drivers started ahead of time
+DRIVER_POOL_MAX_SIZE = 4  # Upper bound on concurrently running browsers
+DRIVER_MAX_USES = 25  # Recycle a driver after this many checkouts
+
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver becomes available within the checkout timeout."""
+
+
+class DriverPool:
+    """
+    Process-wide pool of reusable Selenium WebDriver instances.
+
+    Features:
+    - Starts `size` drivers in the background so the first checkout does not pay browser startup.
+    - Grows on demand up to `max_size` concurrently running drivers.
+    - Health-checks drivers on checkout and recycles them after `max_uses` checkouts or a crash.
+
+    Parameters:
+    factory (callable): Function returning a new WebDriver instance (default is init_driver).
+    size (int): Number of drivers to pre-warm.
+    max_size (int): Maximum number of drivers alive at the same time.
+    max_uses (int): Number of checkouts after which a driver is replaced.
+    """
+
+    def __init__(self, factory=None, size=DRIVER_POOL_SIZE, max_size=DRIVER_POOL_MAX_SIZE,
+                 max_uses=DRIVER_MAX_USES):
+        if factory is None:
+            from functions import init_driver
+            factory = init_driver
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._closed = False
+        for _ in range(min(size, self.max_size)):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _warm_one(self):
+        if not self._slots.acquire(blocking=False):
+            return
+        try:
+            driver = self._create()
+        except Exception as e:
+            print(f"Driver warm-up failed: {e}")
+            self._slots.release()
+            return
+        if self._closed:
+            self._destroy(driver)
+            return
+        self._idle.put(driver)
+
+    def _create(self):
+        driver = self.factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def _destroy(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self._slots.release()
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def checkout(self, timeout=None):
+        """
+        Take a healthy driver out of the pool.
+
+        Features:
+        - Reuses an idle driver when one is available.
+        - Starts a new driver if the pool is below its maximum size.
+        - Otherwise waits for a driver to be checked in.
+        - Stamps the driver with requested_at and pool_wait_seconds, so its first use can be timed
+          from the checkout rather than from when it was started.
+
+        Parameters:
+        timeout (float): Seconds to wait for a driver, None to wait forever.
+
+        Returns:
+        webdriver: Selenium WebDriver instance.
+        """
+        requested_at = time.monotonic()
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                if self._slots.acquire(blocking=False):
+                    try:
+                        driver = self._create()
+                    except Exception:
+                        self._slots.release()
+                        raise
+                else:
+                    try:
+                        driver = self._idle.get(timeout=timeout)
+                    except queue.Empty:
+                        raise DriverPoolTimeout(f"No driver available within {timeout} seconds")
+
+            if self._is_healthy(driver):
+                with self._lock:
+                    self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+                driver.requested_at = requested_at
+                driver.pool_wait_seconds = time.monotonic() - requested_at
+                return driver
+            print("Discarding unhealthy driver.")
+            self._destroy(driver)
+
+    def checkin(self, driver, healthy=True):
+        """
+        Return a driver to the pool.
+
+        Features:
+        - Quits drivers that crashed or reached their maximum number of uses.
+
+        Parameters:
+        driver (webdriver): Driver previously returned by checkout().
+        healthy (bool): False if the caller saw the driver fail.
+
+        Returns:
+        None
+        """
+        with self._lock:
+            uses = self._uses.get(id(driver), 0)
+        if self._closed or not healthy or uses >= self.max_uses:
+            self._destroy(driver)
+            if not self._closed:
+                threading.Thread(target=self._warm_one, daemon=True).start()
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Check out a driver for the duration of a with-block.
+
+        Features:
+        - Recycles the driver if the block raises.
+
+        Parameters:
+        timeout (float): Seconds to wait for a driver, None to wait forever.
+
+        Returns:
+        webdriver: Selenium WebDriver instance.
+        """
+        driver = self.checkout(timeout=timeout)
+        healthy = False
+        try:
+            yield driver
+            healthy = True
+        finally:
+            self.checkin(driver, healthy=healthy)
+
+    def close(self):
+        """
+        Quit all idle drivers and stop accepting check-ins.
+
+        Returns:
+        None
+        """
+        self._closed = True
+        requested_at = time.monotonic()
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(driver)
+
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """
+    Get the process-wide driver pool.
+
+    Returns:
+    DriverPool: Shared driver pool instance.
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool()
+        return _driver_pool
+
+
+def close_driver_pool():
+    """
+    Quit the drivers of the process-wide pool, if it was ever started.
+
+    Returns:
+    None
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is not None:
+            _driver_pool.close()
+            _driver_pool = None
@@ -1,140 +1,488 @@
 import json
 import os
 import random
+import subprocess
+import tempfile
+import threading
 import time
-import numpy as np
-import requests
+from contextlib import nullcontext
 from datetime import datetime
-from pydub import AudioSegment
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip, ImageClip
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException
-from englisttohindi.englisttohindi import EngtoHindi
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from PIL import Image, ImageDraw, ImageFont
-from webdriver_manager.core.os_manager import ChromeType
-from fake_useragent import UserAgent
-import streamlit as st
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
-
-VIDEO_METADATA_FILE = "video_metadata.json"
+# Heavy dependencies (numpy, pydub, moviepy, selenium, webdriver_manager, englisttohindi, PIL,
+# fake_useragent) are imported inside the functions that use them, so pages that never touch
+# them start quickly.
+from quote_source import get_quote_buffer
+from caches import CACHE_DIR, get_pcm_cache, get_translation_cache, get_tts_cache
+from driver_pool import DriverPoolTimeout, get_driver_pool
+from templates import get_template_catalog, get_template_info
+from metadata_store import get_metadata_store
+from resilience import CircuitOpen, Deadline, DeadlineExceeded, call_timeout, get_circuit_breaker
+from tracing import current_span, traced
+
 DEV_MODE = False  # Set to False when deploying the app
+TTS_BACKEND = "crikk"
+TTS_PAGE_URLS = {"in": "https://crikk.com/text-to-speech/hindi/"}
+TTS_AUDIO_URL_PREFIX = "https://crikk.com/app/app/text-to-speech/"
+# The src property is the resolved absolute URL, even when the page sets a relative or protocol-relative one
+AUDIO_SOURCE_SCRIPT = "var s = document.getElementById('audioSource'); return s ? s.src : null;"
+TTS_DEADLINE = 120  # seconds for synthesis plus download of one quote
+TTS_PAGE_LOAD_TIMEOUT = 30  # seconds for the TTS page to load
+TTS_HEDGE_AFTER = 30  # seconds before a second pooled driver races a slow TTS request, None to disable
+TTS_HEDGE_CHECKOUT_TIMEOUT = 2  # seconds the hedge waits for a free driver before giving up
+TRANSLATE_TIMEOUT = 20  # seconds for one translation request
+TRANSLATE_WORKERS = 4
+DOWNLOAD_CONNECT_TIMEOUT = 5
+DOWNLOAD_READ_TIMEOUT = 30  # seconds between bytes of the audio download
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+BACKGROUND_GAIN_DB = -10
+# Mixes are kept lossless so the video's AAC track is the only lossy encode; MP3 is exported on demand
+MIX_FORMAT = "flac"
+AUDIO_EXTENSIONS = {"flac": ".flac", "mp3": ".mp3"}
+MP3_EXPORT_QUALITY = "2"  # libmp3lame VBR quality, about 190 kbps
+MIX_CHUNK_FRAMES = 65536  # frames mixed per chunk when streaming audio
+CAPTION_FONT_DIVISOR = 24  # caption font size is the frame height divided by this
+
+# Output formats rendered in one pass by render_formats; "crop" fills the frame, "pad" letterboxes
+RENDER_PROFILES = {
+    "vertical": {"aspect": "9:16", "width": 1080, "height": 1920, "fit": "crop",
+                 "preset": "veryfast", "crf": 23, "audio_bitrate": "128k"},
+    "square": {"aspect": "1:1", "width": 1080, "height": 1080, "fit": "crop",
+               "preset": "veryfast", "crf": 23, "audio_bitrate": "128k"},
+    "landscape": {"aspect": "16:9", "width": 1920, "height": 1080, "fit": "pad",
+                  "preset": "veryfast", "crf": 23, "audio_bitrate": "128k"},
+}
+
+# Lean launch profile for the TTS page: the page only needs its form, scripts and the audio element
+DRIVER_PROFILE_DIR = os.path.join(CACHE_DIR, "chrome-profiles")
+DRIVER_PAGE_LOAD_STRATEGY = "eager"
+DRIVER_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*adservice.google.*", "*facebook.net*", "*hotjar.com*",
+]
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_translate_executor = None
+_translate_executor_lock = threading.Lock()
+_driver_setup_lock = threading.Lock()
+_chromedriver_path = None
+_user_agents = None
+_profile_slots = {}  # slot → (lock file, driver or None while it starts)
 
 # Fetching a random quote from ZenQuotes API
-def get_quote():
+@traced()
+def get_quote(deadline=None):
     """
     Fetch a random quote from ZenQuotes API.
 
     Features:
-    - Fetches a random quote and its author.
+    - Serves quotes from a shared buffer that is filled in bulk from the batch endpoint.
+    - Skips quotes that were already used for generated audio.
+    - Caps the refill request timeouts by the deadline and fails fast while the API's circuit is open.
 
     Parameters:
-    None
+    deadline (Deadline): Budget of the current quote, None for the default timeouts only.
 
     Returns:
     tuple: (quote, author) if successful, (None, None) otherwise.
     """
-    url = "https://zenquotes.io/api/random"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return data[0]["q"], data[0]["a"]  # Quote and author
-    return None, None
+    return get_quote_buffer().get(deadline=Deadline.of(deadline))
 
 
 # Translating the quote to Hindi
-def translate_to_hindi(text):
+@traced()
+def translate_to_hindi(text, deadline=None):
     """
     Translate English text to Hindi.
 
     Features:
-    - Uses EngtoHindi library to translate text.
+    - Serves repeated translations from the persistent translation cache.
+    - Uses EngtoHindi library to translate text on a cache miss.
+    - Gives up after TRANSLATE_TIMEOUT seconds (or what is left of the deadline) and fails fast
+      while the translation circuit is open.
 
     Parameters:
     text (str): The text to be translated.
+    deadline (Deadline): Budget of the current quote, None for TRANSLATE_TIMEOUT only.
+
+    Returns:
+    str: Translated text in Hindi, None if the translation timed out, the deadline ran out or the circuit is open.
+    """
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from englisttohindi.englisttohindi import EngtoHindi
+
+    cache = get_translation_cache()
+    translated = cache.get(text)
+    current_span().set(cache_hit=translated is not None, chars=len(text))
+    if translated is not None:
+        return translated
+
+    breaker = get_circuit_breaker("translation")
+    try:
+        timeout = call_timeout(Deadline.of(deadline), TRANSLATE_TIMEOUT, "translation")
+        breaker.allow()
+    except (DeadlineExceeded, CircuitOpen) as e:
+        print(f"Translation skipped: {e}")
+        current_span().set(status="failed", reason="deadline" if isinstance(e, DeadlineExceeded) else "circuit open")
+        return None
+    # EngtoHindi has no timeout of its own, so the call runs on a worker thread that is abandoned on timeout
+    future = get_translate_executor().submit(lambda: EngtoHindi(text).convert)
+    try:
+        translated = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # A request still queued behind hung ones is dropped; a running one cannot be stopped
+        queued = future.cancel()
+        print(f"Translation timed out after {timeout:.1f} seconds{' in the queue' if queued else ''}.")
+        current_span().set(status="failed", reason="queued" if queued else "timeout")
+        # Timeouts count against the circuit, so hung requests open it instead of piling up more work
+        breaker.record_failure()
+        return None
+    except Exception:
+        breaker.record_failure()
+        raise
+    if translated:
+        breaker.record_success()
+        cache.put(text, translated)
+    else:
+        breaker.record_failure()
+    return translated
+
+
+# Thread pool running translations so they can be timed out
+def get_translate_executor():
+    """
+    Get the process-wide thread pool that runs translation requests.
+
+    Parameters:
+    None
+
+    Returns:
+    ThreadPoolExecutor: Shared executor.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _translate_executor
+    with _translate_executor_lock:
+        if _translate_executor is None:
+            _translate_executor = ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS, thread_name_prefix="translate")
+        return _translate_executor
+
+# Shared HTTP session used to download TTS audio
+def get_http_session():
+    """
+    Get the process-wide HTTP session used for audio downloads.
+
+    Features:
+    - Keeps connections alive and pools them across downloads and threads.
+    - Retries transient server errors with a short backoff.
+
+    Parameters:
+    None
 
     Returns:
-    str: Translated text in Hindi.
+    requests.Session: Shared session.
     """
-    res = EngtoHindi(text)
-    return res.convert
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = DOWNLOAD_USER_AGENT
+            retries = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
 
 # Function to get audio from the text-to-speech service
-def get_audio_data(text, driver, lang="in"):
+@traced()
+def get_audio_data(text, driver, lang="in", deadline=TTS_DEADLINE, output_path=None, timings=None, cancel=None):
     """
     Get audio data from a text-to-speech service.
 
     Features:
     - Uses Selenium to interact with a TTS service.
-    - Fetches audio data for the given text.
+    - Waits for the audio source to change instead of sleeping and polling.
+    - Streams the audio through a shared, connection-pooled HTTP session.
+    - Bounds the page load, the wait for the audio and every download read by the deadline.
+    - Stops early when the cancel event is set (e.g. a hedged request already won).
 
     Parameters:
     text (str): The text to be converted to audio.
     driver (webdriver): Selenium WebDriver instance.
     lang (str): Language code (default is "in" for Hindi).
+    deadline (Deadline | float): Overall time limit for synthesis and download, as a Deadline or seconds.
+    output_path (str): If given, the audio is streamed to this file instead of returned.
+    timings (dict): If given, filled with wait_seconds, download_seconds, bytes and page_load_seconds,
+        plus on a new driver's first use driver_ready_seconds (checkout to first page loaded, or
+        init_driver() to first page loaded for a driver that did not come from the pool),
+        driver_pool_wait_seconds (time spent in checkout) and driver_launch_seconds (browser start).
+    cancel (threading.Event): If given and set, the request is abandoned.
 
     Returns:
-    bytes: Audio data if successful, None otherwise.
+    bytes: Audio data if successful (or output_path when it was given), None otherwise.
     """
-    if lang == "in":
-        driver.get("https://crikk.com/text-to-speech/hindi/")
-    else:
+    import requests
+    from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException, TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    if lang not in TTS_PAGE_URLS:
         raise ValueError("Unsupported language code")
 
+    trace = current_span()
+    trace.set(chars=len(text))
+    deadline = Deadline.of(deadline)
+    remaining = deadline.remaining
+
+    page_start = time.monotonic()
+    try:
+        driver.set_page_load_timeout(max(1.0, min(TTS_PAGE_LOAD_TIMEOUT, remaining())))
+        driver.get(TTS_PAGE_URLS[lang])
+    except TimeoutException:
+        print("TTS page load timed out.")
+        trace.set(status="failed", reason="page load timeout")
+        return None
+    page_load_seconds = time.monotonic() - page_start
+    # Report the time to first page once per driver. Pooled drivers are timed from their checkout,
+    # so the time a pre-warmed driver sat idle in the pool is not counted.
+    driver_ready = {}
+    launch_started = getattr(driver, "launch_started", None)
+    if launch_started is not None:
+        driver.launch_started = None
+        ready_from = getattr(driver, "requested_at", None) or launch_started
+        pool_wait_seconds = getattr(driver, "pool_wait_seconds", None)
+        driver_ready = {"driver_ready_seconds": time.monotonic() - ready_from,
+                        "driver_launch_seconds": driver.launch_seconds}
+        if pool_wait_seconds is not None:
+            driver_ready["driver_pool_wait_seconds"] = pool_wait_seconds
+        print(f"Driver ready {driver_ready['driver_ready_seconds']:.2f}s after "
+              f"{'checkout' if pool_wait_seconds is not None else 'init_driver()'} "
+              f"(pool wait {pool_wait_seconds or 0:.2f}s, launch {driver.launch_seconds:.2f}s, "
+              f"first page {page_load_seconds:.2f}s)")
+
     try:
         textarea = driver.find_element(By.ID, "promptText")
         textarea.clear()
         textarea.send_keys(text)
     except NoSuchElementException:
         print("Textarea not found.")
+        trace.set(status="failed", reason="textarea not found")
         return None
 
+    # Remember the current source so a stale URL from an earlier request is never picked up
+    previous_src = driver.execute_script(AUDIO_SOURCE_SCRIPT)
+
     try:
-        generate_button = driver.find_element(By.ID, "action_submit")
+        generate_button = WebDriverWait(driver, min(10, remaining())).until(
+            EC.element_to_be_clickable((By.ID, "action_submit"))
+        )
         driver.execute_script("arguments[0].scrollIntoView(true);", generate_button)
-        time.sleep(1)
-        generate_button.click()
-    except (NoSuchElementException, ElementClickInterceptedException):
+        try:
+            generate_button.click()
+        except ElementClickInterceptedException:
+            driver.execute_script("arguments[0].click();", generate_button)
+    except (NoSuchElementException, TimeoutException):
         print("Generate button click failed.")
+        trace.set(status="failed", reason="generate button")
+        return None
+
+    def new_audio_src(d):
+        if cancel is not None and cancel.is_set():
+            return "cancelled"
+        src = d.execute_script(AUDIO_SOURCE_SCRIPT)
+        if src and src != previous_src and TTS_AUDIO_URL_PREFIX in src:
+            return src
+        return False
+
+    wait_start = time.monotonic()
+    try:
+        audio_src = WebDriverWait(driver, remaining(), poll_frequency=0.25).until(new_audio_src)
+    except TimeoutException:
+        print(f"No audio source after {deadline.seconds} seconds.")
+        trace.set(status="failed", reason="no audio source")
+        return None
+    if audio_src == "cancelled":
+        trace.set(status="cancelled")
         return None
+    wait_seconds = time.monotonic() - wait_start
+    print(f"Found audio source URL: {audio_src}")
+
+    download_start = time.monotonic()
+    tmp_path = f"{output_path}.part" if output_path else None
+    chunks = []
+    received = 0
+    complete = False
+    try:
+        timeout = (min(DOWNLOAD_CONNECT_TIMEOUT, max(1.0, remaining())),
+                   min(DOWNLOAD_READ_TIMEOUT, max(1.0, remaining())))
+        with get_http_session().get(audio_src, stream=True, timeout=timeout) as response:
+            print(f"Audio response status: {response.status_code}")
+            # Retries done by the session's urllib3 Retry before this response
+            retry_state = getattr(response.raw, "retries", None)
+            trace.set(retries=len(retry_state.history) if retry_state else 0, http_status=response.status_code)
+            if response.status_code == 200:
+                with open(tmp_path, "wb") if tmp_path else nullcontext() as sink:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if not remaining():
+                            print("Audio download exceeded the deadline.")
+                            break
+                        if cancel is not None and cancel.is_set():
+                            break
+                        received += len(chunk)
+                        if sink:
+                            sink.write(chunk)
+                        else:
+                            chunks.append(chunk)
+                    else:
+                        complete = received > 0
+    except requests.RequestException as e:
+        print(f"Audio download failed: {e}")
+    download_seconds = time.monotonic() - download_start
+
+    print(f"TTS wait {wait_seconds:.2f}s, download {download_seconds:.2f}s ({received} bytes)")
+    trace.set(bytes=received, page_load_seconds=round(page_load_seconds, 3), wait_seconds=round(wait_seconds, 3),
+              download_seconds=round(download_seconds, 3))
+    trace.set(**{name: round(value, 3) for name, value in driver_ready.items()})
+    if timings is not None:
+        timings.update(wait_seconds=wait_seconds, download_seconds=download_seconds, bytes=received,
+                       page_load_seconds=page_load_seconds, **driver_ready)
+
+    if not complete:
+        if cancel is not None and cancel.is_set():
+            trace.set(status="cancelled")
+        else:
+            trace.set(status="failed", reason="download incomplete")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    if output_path:
+        os.replace(tmp_path, output_path)
+        return output_path
+    return b"".join(chunks)
+
 
-    audio_element_xpath = "//audio/source[@id='audioSource']"
-    for attempt in range(10):
+# Synthesize speech with a driver from the shared pool
+@traced()
+def synthesize_speech(text, output_path, lang="in", timings=None, deadline=None, hedge_after=TTS_HEDGE_AFTER):
+    """
+    Write TTS audio for the given text to an MP3 file using a pooled WebDriver.
+
+    Features:
+    - Serves text that was synthesized before from the TTS cache without touching Selenium.
+    - Checks a warm driver out of the process-wide pool instead of starting a browser.
+    - Safe to call from several threads; each call uses its own driver.
+    - Hedges: if the first request has not finished after `hedge_after` seconds (or failed early),
+      a second pooled driver races it and the first audio to arrive wins.
+    - Fails fast while the TTS provider's circuit is open, and returns None without calling it once the
+      deadline has run out. Only requests that reached the provider count towards opening the circuit.
+
+    Parameters:
+    text (str): The text to be converted to audio.
+    output_path (str): Path of the MP3 file to write.
+    lang (str): Language code (default is "in" for Hindi).
+    timings (dict): If given, filled with the wait and download timings of the winning request.
+    deadline (Deadline | float): Budget for synthesis and download, None for TTS_DEADLINE.
+    hedge_after (float): Seconds before the hedged request starts, None to never hedge.
+
+    Returns:
+    str: output_path if successful, None otherwise.
+    """
+    if lang not in TTS_PAGE_URLS:
+        raise ValueError("Unsupported language code")
+
+    trace = current_span()
+    cache = get_tts_cache()
+    if cache.copy_to(text, lang, TTS_BACKEND, output_path):
+        trace.set(cache_hit=True)
+        return output_path
+
+    trace.set(cache_hit=False)
+    deadline = Deadline.of(deadline if deadline is not None else TTS_DEADLINE)
+    if deadline.expired():
+        print("No time left for TTS.")
+        trace.set(status="failed", reason="deadline")
+        return None
+    breaker = get_circuit_breaker(f"tts:{TTS_BACKEND}")
+    breaker.allow()
+
+    pool = get_driver_pool()
+    cancel = threading.Event()
+    done = threading.Condition()
+    state = {"winner": None, "finished": 0, "closed": False, "requested": False}
+    attempt_timings = [{}, {}]
+
+    def attempt(n, checkout_timeout):
+        path = f"{output_path}.attempt{n}"
+        audio_path = None
         try:
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, audio_element_xpath))
-            )
-            audio_element = driver.find_element(By.XPATH, audio_element_xpath)
-            audio_src = audio_element.get_attribute('src')
-            
-            print(f"Attempt {attempt + 1}: Found audio source URL: {audio_src}")
-
-            if "https://crikk.com/app/app/text-to-speech/" in audio_src:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                session = requests.Session()
-                retries = Retry(
-                    total=10,  # Increase the total retries
-                    backoff_factor=1,  # Increase backoff time between retries (e.g., 1s, 2s, 4s, ...)
-                    status_forcelist=[500, 502, 503, 504],  # Retry on specific HTTP errors
-                )
-                session.mount("https://", HTTPAdapter(max_retries=retries))
-                audio_response = session.get(audio_src, headers=headers, timeout=30)
-                # audio_response = requests.get(audio_src, timeout=30)
-                print(f"Audio response status: {audio_response.status_code}")
-                if audio_response.status_code == 200:
-                    return audio_response.content
+            with pool.driver(timeout=checkout_timeout) as driver:
+                state["requested"] = True
+                audio_path = get_audio_data(text, driver, lang=lang, deadline=deadline, output_path=path,
+                                            timings=attempt_timings[n], cancel=cancel)
+        except DriverPoolTimeout as e:
+            print(f"TTS attempt {n + 1} got no driver: {e}")
         except Exception as e:
-            print(f"Error on attempt {attempt + 1}: {e}")
-            pass
-    return None
+            # The driver was recycled by the pool; the other attempt (if any) may still succeed
+            print(f"TTS attempt {n + 1} failed: {e}")
+        with done:
+            if audio_path and state["winner"] is None and not state["closed"]:
+                state["winner"] = n
+                cancel.set()
+            elif audio_path:
+                os.remove(audio_path)  # lost the race or came too late
+            state["finished"] += 1
+            done.notify_all()
+
+    started = 1
+    threading.Thread(target=attempt, args=(0, deadline.remaining()), daemon=True).start()
+    with done:
+        if hedge_after is not None:
+            done.wait_for(lambda: state["winner"] is not None or state["finished"],
+                          timeout=min(hedge_after, deadline.remaining()))
+        hedge = hedge_after is not None and state["winner"] is None and not deadline.expired()
+    if hedge:
+        print("TTS request is slow or failed, racing it with a second driver.")
+        trace.set(hedged=True)
+        started = 2
+        threading.Thread(
+            target=attempt, args=(1, min(TTS_HEDGE_CHECKOUT_TIMEOUT, deadline.remaining())), daemon=True
+        ).start()
+    with done:
+        # Every attempt is bounded by the deadline; the grace covers quitting the browser wait
+        done.wait_for(lambda: state["winner"] is not None or state["finished"] == started,
+                      timeout=deadline.remaining() + 5)
+        winner = state["winner"]
+        state["closed"] = True
+    cancel.set()
+
+    if winner is None:
+        # An attempt that got no driver never reached the provider, so it says nothing about its health
+        if state["requested"]:
+            breaker.record_failure()
+        trace.set(status="failed", reason="provider" if state["requested"] else "no driver")
+        return None
+    breaker.record_success()
+    os.replace(f"{output_path}.attempt{winner}", output_path)
+    trace.set(winner="hedge" if winner else "primary")
+    if timings is not None:
+        timings.update(attempt_timings[winner])
+    cache.put_file(text, lang, TTS_BACKEND, output_path)
+    return output_path
 
 
 # Save the audio data to a file (MP3)
@@ -156,64 +504,504 @@ def save_audio_to_mp3(audio_data, filename):
         audio_file.write(audio_data)
 
 
+# List background tracks, rescanning the directory only when it changes
+def list_background_tracks(background_audio_dir="audios"):
+    """
+    List the MP3 background tracks in a directory.
+
+    Features:
+    - Served by the shared template catalog, which rescans only when the directory changes.
+
+    Parameters:
+    background_audio_dir (str): Directory containing background music files.
+
+    Returns:
+    list: File names of the MP3 tracks.
+    """
+    return get_template_catalog().names(background_audio_dir, ".mp3")
+
+
+# Tile the background bed to a number of frames
+def tile_background(background, start, frames):
+    """
+    Take `frames` frames of a looped background track.
+
+    Features:
+    - Loops the track by index arithmetic instead of concatenating copies.
+
+    Parameters:
+    background (numpy.ndarray): Background PCM of shape (frames, channels).
+    start (int): Frame offset into the looped track.
+    frames (int): Number of frames to take.
+
+    Returns:
+    numpy.ndarray: Array of shape (frames, channels).
+    """
+    import numpy as np
+
+    return background[(start + np.arange(frames)) % len(background)]
+
+
+# Mix TTS PCM with a background bed
+def mix_with_background(tts_samples, background_samples, gain_db=BACKGROUND_GAIN_DB):
+    """
+    Overlay attenuated background PCM on TTS PCM.
+
+    Features:
+    - Applies the background gain and sums both tracks as float32, clipping to int16.
+
+    Parameters:
+    tts_samples (numpy.ndarray): TTS PCM of shape (frames, channels).
+    background_samples (numpy.ndarray): Background PCM of the same shape.
+    gain_db (float): Gain applied to the background in dB.
+
+    Returns:
+    numpy.ndarray: Mixed int16 PCM.
+    """
+    import numpy as np
+
+    mixed = tts_samples.astype(np.float32)
+    mixed += background_samples.astype(np.float32) * np.float32(10 ** (gain_db / 20))
+    return np.clip(mixed, -32768, 32767).astype(np.int16)
+
+
+# Path of the ffmpeg binary used for audio and video processing
+def get_ffmpeg_binary():
+    """
+    Get the ffmpeg binary used for audio and video processing.
+
+    Features:
+    - Reuses the binary pydub resolved, so all stages use the same ffmpeg.
+
+    Parameters:
+    None
+
+    Returns:
+    str: Path or name of the ffmpeg binary.
+    """
+    from pydub import AudioSegment
+
+    return AudioSegment.converter
+
+
+# Stream a TTS track and a looped background bed through the mixer
+@traced()
+def stream_mix_audio(tts_audio_path, background_audio_path, output_path, output_format="mp3",
+                     chunk_frames=MIX_CHUNK_FRAMES):
+    """
+    Mix TTS audio with a looped background track in fixed-size chunks.
+
+    Features:
+    - Decodes the TTS track through an ffmpeg pipe, one chunk at a time.
+    - Loops the cached background PCM by index arithmetic.
+    - Pipes mixed chunks straight into the encoder, so peak memory does not grow with duration.
+
+    Parameters:
+    tts_audio_path (str): Path to the TTS audio file.
+    background_audio_path (str): Path to the background music file.
+    output_path (str): Path of the mixed file to write.
+    output_format (str): ffmpeg output format (default is "mp3").
+    chunk_frames (int): Number of audio frames mixed per chunk.
+
+    Returns:
+    str: output_path if successful, None otherwise.
+    """
+    import numpy as np
+    from pydub.utils import mediainfo
+
+    pcm_cache = get_pcm_cache()
+    tts_info = mediainfo(tts_audio_path)
+
+    # Mix at the higher rate and channel count of the two tracks, as AudioSegment.overlay does
+    template = get_template_info(background_audio_path)
+    if template and "sample_rate" in template:
+        background_rate, background_channels = template["sample_rate"], template["channels"]
+    else:
+        background_rate, background_channels = pcm_cache.info(background_audio_path)
+    tts_channels = int(tts_info["channels"])
+    frame_rate = max(int(tts_info["sample_rate"]), background_rate)
+    channels = max(tts_channels, background_channels)
+    background, _ = pcm_cache.load(background_audio_path, frame_rate, channels)
+
+    # The TTS track keeps its own channel count here; ffmpeg's upmix attenuates, pydub's duplicates
+    decoder = subprocess.Popen(
+        [get_ffmpeg_binary(), "-v", "error", "-i", tts_audio_path, "-acodec", "pcm_s16le",
+         "-f", "s16le", "-ar", str(frame_rate), "-ac", str(tts_channels), "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    encoder = subprocess.Popen(
+        [get_ffmpeg_binary(), "-y", "-v", "error", "-f", "s16le", "-ar", str(frame_rate),
+         "-ac", str(channels), "-i", "-", "-f", output_format, output_path],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    frame_bytes = 2 * tts_channels
+    offset = 0
+    try:
+        while True:
+            data = decoder.stdout.read(chunk_frames * frame_bytes)
+            if not data:
+                break
+            data = data[:len(data) - len(data) % frame_bytes]
+            tts_samples = np.frombuffer(data, dtype=np.int16).reshape(-1, tts_channels)
+            if tts_channels != channels:
+                tts_samples = np.repeat(tts_samples[:, :1], channels, axis=1)
+            bed = tile_background(background, offset, len(tts_samples))
+            encoder.stdin.write(mix_with_background(tts_samples, bed).tobytes())
+            offset += len(tts_samples)
+    except BrokenPipeError:
+        pass
+    finally:
+        decoder.stdout.close()
+        encoder.stdin.close()
+        decoder_status = decoder.wait()
+        encoder_status = encoder.wait()
+
+    if decoder_status or encoder_status or not offset:
+        print(f"Audio mix failed (decoder {decoder_status}, encoder {encoder_status}).")
+        current_span().set(status="failed")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    current_span().set(frames=offset, bytes=os.path.getsize(output_path))
+    return output_path
+
+
 # Merge TTS audio with background music
-def merge_audio(tts_audio_path, background_audio_dir="audios", output_dir="output/audios"):
+@traced()
+def merge_audio(tts_audio_path, background_audio_dir="audios", output_dir="output/audios", background_audio_path=None,
+                audio_format=MIX_FORMAT):
     """
     Merge TTS audio with background music.
 
     Features:
-    - Combines TTS audio with a randomly selected background music track.
+    - Combines TTS audio with a randomly selected (or the given) background music track.
     - Adjusts the volume of the background music.
+    - Decodes each background track once and reuses the cached PCM afterwards.
+    - Mixes in fixed-size chunks so memory stays flat for long narrations.
+    - Writes a lossless FLAC by default, so rendering encodes the audio only once (use export_mp3 for an MP3).
+    - Names the mix after the TTS file, so each quote's mix is as unique as its TTS path.
+    - Links the mixed file to its TTS record in the metadata store.
 
     Parameters:
     tts_audio_path (str): Path to the TTS audio file.
     background_audio_dir (str): Directory containing background music files.
     output_dir (str): Directory to save the merged audio file.
+    background_audio_path (str): Background track to use instead of a random one.
+    audio_format (str): "flac" or "mp3".
 
     Returns:
     str: Path to the merged audio file if successful, None otherwise.
     """
     os.makedirs(output_dir, exist_ok=True)
-    tts_audio = AudioSegment.from_mp3(tts_audio_path)
 
-    background_files = [f for f in os.listdir(background_audio_dir) if f.endswith(".mp3")]
-    if not background_files:
-        # display error message
+    if not background_audio_path:
+        background_files = list_background_tracks(background_audio_dir)
+        if not background_files:
+            # display error message
+            current_span().set(status="failed", reason="no background tracks")
+            return None
+        background_audio_path = os.path.join(background_audio_dir, random.choice(background_files))
+
+    stem = os.path.splitext(os.path.basename(tts_audio_path))[0]
+    final_audio_path = os.path.join(output_dir, stem + AUDIO_EXTENSIONS[audio_format])
+    current_span().set(audio_format=audio_format)
+    if not stream_mix_audio(tts_audio_path, background_audio_path, final_audio_path, output_format=audio_format):
+        current_span().set(status="failed")
         return None
+    # Index the mixed file so its captions can be found without scanning the audio metadata
+    get_metadata_store().link_final_audio(tts_audio_path, final_audio_path)
+    return final_audio_path
 
-    background_audio_path = os.path.join(background_audio_dir, random.choice(background_files))
-    background_audio = AudioSegment.from_mp3(background_audio_path)
 
-    if len(background_audio) > len(tts_audio):
-        background_audio = background_audio[:len(tts_audio)]
-    else:
-        background_audio = background_audio * (len(tts_audio) // len(background_audio)) + background_audio[:len(tts_audio) % len(background_audio)]
+# Export a mixed audio file as MP3 when a user asks for one
+@traced()
+def export_mp3(audio_path, output_path=None):
+    """
+    Encode a mixed audio file to MP3.
 
-    background_audio = background_audio - 10
-    final_audio = tts_audio.overlay(background_audio)
+    Features:
+    - Writes the MP3 next to the mix by default and reuses it if it is already newer than the mix.
+    - Writes to a temporary file first, so a half-written MP3 is never listed.
 
-    final_audio_path = os.path.join(output_dir, os.path.basename(tts_audio_path))
-    final_audio.export(final_audio_path, format="mp3")
-    return final_audio_path
+    Parameters:
+    audio_path (str): Path to the mixed audio (usually a FLAC from merge_audio).
+    output_path (str): Path of the MP3 to write, None for the mix's path with an .mp3 extension.
+
+    Returns:
+    str: Path of the MP3 file.
+    """
+    if output_path is None:
+        output_path = os.path.splitext(audio_path)[0] + AUDIO_EXTENSIONS["mp3"]
+    if os.path.abspath(output_path) == os.path.abspath(audio_path):
+        return output_path
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(audio_path):
+        return output_path
+
+    tmp_path = f"{output_path}.part"
+    try:
+        run_ffmpeg([get_ffmpeg_binary(), "-y", "-v", "error", "-i", audio_path, "-vn",
+                    "-codec:a", "libmp3lame", "-q:a", MP3_EXPORT_QUALITY, "-f", "mp3", tmp_path])
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+# List the mixed audio files, one per quote
+def list_final_audio(output_dir="output/audios"):
+    """
+    List generated audio files, preferring the lossless mix when an MP3 export of it exists too.
+
+    Parameters:
+    output_dir (str): Directory holding the mixed audio files.
+
+    Returns:
+    list: File names, newest name first.
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    preference = list(AUDIO_EXTENSIONS.values())
+    chosen = {}
+    for file_name in os.listdir(output_dir):
+        stem, extension = os.path.splitext(file_name)
+        if extension not in preference:
+            continue
+        if stem not in chosen or preference.index(extension) < preference.index(os.path.splitext(chosen[stem])[1]):
+            chosen[stem] = file_name
+    return sorted(chosen.values(), reverse=True)
+
+
+class RenderCancelled(Exception):
+    """Raised from a progress callback to stop a render."""
+
+
+# Run ffmpeg, reporting progress while it encodes
+@traced()
+def run_ffmpeg(command, duration=None, progress_callback=None):
+    """
+    Run an ffmpeg command and wait for it to finish.
+
+    Features:
+    - Parses ffmpeg's -progress output and reports the fraction of `duration` written.
+    - Kills ffmpeg if the progress callback raises (e.g. RenderCancelled).
+
+    Parameters:
+    command (list): ffmpeg command line, starting with the binary.
+    duration (float): Expected output duration in seconds, used to compute progress.
+    progress_callback (callable): Called with a fraction between 0 and 1.
+
+    Returns:
+    None
+    """
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            command[:1] + ["-nostats", "-progress", "pipe:1"] + command[1:],
+            stdout=subprocess.PIPE, stderr=errors, text=True,
+        )
+        try:
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                if progress_callback and duration and key == "out_time_us" and value.isdigit():
+                    progress_callback(min(1.0, int(value) / (duration * 1e6)))
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        if process.wait() != 0:
+            errors.seek(0)
+            raise RuntimeError(errors.read().decode(errors="replace").strip() or "ffmpeg failed")
+    if duration:
+        current_span().set(media_seconds=round(duration, 3))
+    if os.path.isfile(command[-1]):
+        current_span().set(bytes=os.path.getsize(command[-1]))
+
+
+# Loop a video template under an audio track without re-encoding the video
+@traced()
+def mux_looped_video(video_path, audio_path, output_path, progress_callback=None):
+    """
+    Mux an audio track over a looped video using ffmpeg stream copy.
+
+    Features:
+    - Loops the template with -stream_loop and trims it to the audio duration.
+    - Copies the video stream as-is and only encodes the audio to AAC.
+
+    Parameters:
+    video_path (str): Path to the video file.
+    audio_path (str): Path to the audio file.
+    output_path (str): Path to save the final video.
+    progress_callback (callable): Called with the fraction of the output written.
+
+    Returns:
+    str: Path to the final video file.
+    """
+    from pydub.utils import mediainfo
+
+    audio_duration = float(mediainfo(audio_path)["duration"])
+    command = [
+        get_ffmpeg_binary(), "-y", "-v", "error",
+        "-stream_loop", "-1", "-i", video_path,
+        "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c:v", "copy", "-c:a", "aac",
+        "-t", f"{audio_duration:.3f}",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    run_ffmpeg(command, audio_duration, progress_callback)
+    return output_path
+
+
+# Probe a media file with ffprobe
+@traced()
+def probe_media(path):
+    """
+    Read the streams and format of a media file.
+
+    Features:
+    - Runs ffprobe once and returns the parsed JSON.
+
+    Parameters:
+    path (str): Path to the media file.
+
+    Returns:
+    dict: ffprobe output with "streams" and "format" keys.
+    """
+    from pydub.utils import get_prober_name
+
+    result = subprocess.run(
+        [get_prober_name(), "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or f"Cannot probe {path}")
+    return json.loads(result.stdout)
+
+
+# Read a video's frame size, from the template index when possible
+def get_video_size(video_path):
+    """
+    Get the frame size of a video.
+
+    Features:
+    - Reads the size from the template index and only probes files that are not indexed.
+
+    Parameters:
+    video_path (str): Path to the video file.
+
+    Returns:
+    tuple: (width, height) in pixels.
+    """
+    template = get_template_info(video_path)
+    if template and "width" in template:
+        return template["width"], template["height"]
+    video_stream = next(s for s in probe_media(video_path)["streams"] if s["codec_type"] == "video")
+    return int(video_stream["width"]), int(video_stream["height"])
 
 
-def create_video_with_audio(video_path, audio_path, output_path, captions_texts):
+# Burn pre-rasterized captions into a looped video template
+@traced()
+def render_captioned_video(video_path, audio_path, output_path, captions_texts, threads=None, progress_callback=None):
+    """
+    Render a video with captions using an ffmpeg overlay filter graph.
+
+    Features:
+    - Rasterizes each caption once with PIL (cached across renders).
+    - Shows each caption image during its own time window via overlay enable expressions.
+    - Loops the template with -stream_loop and trims it to the audio duration.
+    - Reads the template size from the template index instead of probing when it is indexed.
+
+    Parameters:
+    video_path (str): Path to the video file.
+    audio_path (str): Path to the audio file.
+    output_path (str): Path to save the final video.
+    captions_texts (list): List of text captions to be added to the video.
+    threads (int): Encoder threads, None to let ffmpeg decide.
+    progress_callback (callable): Called with the fraction of the output written.
+
+    Returns:
+    str: Path to the final video file.
+    """
+    from pydub.utils import mediainfo
+    from captions import caption_windows, rasterize_caption
+
+    width, height = get_video_size(video_path)
+    audio_duration = float(mediainfo(audio_path)["duration"])
+
+    font_size = max(16, height // CAPTION_FONT_DIVISOR)
+    images = [rasterize_caption(text, int(width * 0.9), font_size) for text in captions_texts]
+    windows = caption_windows(captions_texts, audio_duration)
+
+    command = [get_ffmpeg_binary(), "-y", "-v", "error", "-stream_loop", "-1", "-i", video_path, "-i", audio_path]
+    filters = []
+    label = "0:v"
+    for n, (image, (start, end)) in enumerate(zip(images, windows)):
+        command += ["-i", image]
+        filters.append(
+            f"[{label}][{n + 2}:v]overlay=x=(W-w)/2:y=H-h-H/20:"
+            f"enable='between(t,{start:.3f},{end:.3f})'[v{n + 1}]"
+        )
+        label = f"v{n + 1}"
+
+    command += [
+        "-filter_complex", ";".join(filters),
+        "-map", f"[{label}]", "-map", "1:a:0",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-t", f"{audio_duration:.3f}",
+        "-movflags", "+faststart",
+    ]
+    if threads:
+        command += ["-threads", str(threads)]
+    command.append(output_path)
+    run_ffmpeg(command, audio_duration, progress_callback)
+    return output_path
+
+
+@traced()
+def create_video_with_audio(video_path, audio_path, output_path, captions_texts, threads=None, progress_callback=None):
     """
     Create a video with synchronized audio and captions.
 
     Features:
     - Combines video and audio files.
-    - Adds text captions to the video.
+    - Adds text captions to the video as pre-rasterized overlays.
+    - Stream-copies the looped template when nothing has to be drawn on the frames.
 
     Parameters:
     video_path (str): Path to the video file.
     audio_path (str): Path to the audio file.
     output_path (str): Path to save the final video.
     captions_texts (list): List of text captions to be added to the video.
+    threads (int): Encoder threads, None to let the encoder decide.
+    progress_callback (callable): Called with the fraction of the output written; may raise RenderCancelled.
 
     Returns:
     str: Path to the final video file.
     """
+    from captions import caption_windows, rasterize_caption
+
+    captions_texts = [text for text in captions_texts or [] if text and text.strip()]
+    trace = current_span()
+    trace.set(captions=len(captions_texts))
+
+    try:
+        if captions_texts:
+            trace.set(renderer="overlay")
+            return render_captioned_video(
+                video_path, audio_path, output_path, captions_texts, threads, progress_callback
+            )
+        # Without overlays there is nothing to composite, so the frames never need decoding
+        trace.set(renderer="stream_copy")
+        return mux_looped_video(video_path, audio_path, output_path, progress_callback)
+    except (RuntimeError, OSError, KeyError, ValueError, StopIteration) as e:
+        print(f"ffmpeg render failed, falling back to a full render: {e}")
+        trace.set(renderer="moviepy", fallback_reason=str(e)[:200])
+
+    from moviepy.editor import AudioFileClip, CompositeVideoClip, ImageClip, VideoFileClip
+
     video_clip = VideoFileClip(video_path)
     audio_clip = AudioFileClip(audio_path)
 
@@ -226,17 +1014,158 @@ def create_video_with_audio(video_path, audio_path, output_path, captions_texts)
     video_clip = video_clip.set_audio(audio_clip)
 
     text_clips = []
-
+    font_size = max(16, video_clip.h // CAPTION_FONT_DIVISOR)
+    for text, (start, end) in zip(captions_texts, caption_windows(captions_texts, audio_duration)):
+        image = rasterize_caption(text, int(video_clip.w * 0.9), font_size)
+        text_clips.append(
+            ImageClip(image).set_start(start).set_duration(end - start).set_position(("center", 0.75), relative=True)
+        )
 
     # Combine the video and the text clips into a final video
     final_clip = CompositeVideoClip([video_clip] + text_clips)
 
     # Write the final video to a file
-    final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
+    final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac", threads=threads)
 
     return output_path
 
 
+# Build the path of one format of a multi-format render
+def profile_output_path(output_path, profile):
+    """
+    Get the output path of one render profile.
+
+    Parameters:
+    output_path (str): Path the video would have as a single render (e.g. output/videos/name.mp4).
+    profile (str): Name of the render profile.
+
+    Returns:
+    str: The path with the profile name before the extension (e.g. output/videos/name_square.mp4).
+    """
+    stem, extension = os.path.splitext(output_path)
+    return f"{stem}_{profile}{extension or '.mp4'}"
+
+
+# Find the part of the source frame that stays visible in every output format
+def caption_safe_area(width, height, profiles):
+    """
+    Compute the centred region of the source frame that none of the profiles crops away.
+
+    Parameters:
+    width (int): Source frame width.
+    height (int): Source frame height.
+    profiles (list): Render profile dicts.
+
+    Returns:
+    tuple: (safe width, safe height) in source pixels.
+    """
+    safe_width, safe_height = width, height
+    for profile in profiles:
+        if profile["fit"] == "crop":
+            # Scaled to cover the output, the frame loses its overflow on the longer side
+            scale = max(profile["width"] / width, profile["height"] / height)
+            safe_width = min(safe_width, profile["width"] / scale)
+            safe_height = min(safe_height, profile["height"] / scale)
+    return int(safe_width), int(safe_height)
+
+
+# Scale, crop or pad one branch of a multi-format filter graph
+def profile_filter(profile):
+    """
+    Build the ffmpeg filter chain fitting the source frame into a profile's size.
+
+    Parameters:
+    profile (dict): Render profile.
+
+    Returns:
+    str: Filter chain.
+    """
+    width, height = profile["width"], profile["height"]
+    if profile["fit"] == "crop":
+        return f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},setsar=1"
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1")
+
+
+# Render several output formats of one video from a single decode
+@traced()
+def render_formats(video_path, audio_path, output_paths, captions_texts, threads=None, progress_callback=None):
+    """
+    Render a captioned video in several formats in one ffmpeg pass.
+
+    Features:
+    - Decodes the looped template and the audio once and burns the captions in once.
+    - Splits the captioned frames into one branch per profile with its own scale/crop/pad
+      and encoder settings (see RENDER_PROFILES).
+    - Places the captions inside the area every profile keeps, so cropping never cuts them off.
+    - Removes all outputs if the render fails or is cancelled.
+
+    Parameters:
+    video_path (str): Path to the video file.
+    audio_path (str): Path to the audio file.
+    output_paths (dict): Profile name → path of the video to write.
+    captions_texts (list): List of text captions to be added to the video.
+    threads (int): Encoder threads, None to let ffmpeg decide.
+    progress_callback (callable): Called with the fraction of the output written; may raise RenderCancelled.
+
+    Returns:
+    dict: Profile name → path of the rendered video.
+    """
+    from pydub.utils import mediainfo
+    from captions import caption_windows, rasterize_caption
+
+    profiles = {name: RENDER_PROFILES[name] for name in output_paths}
+    captions_texts = [text for text in captions_texts or [] if text and text.strip()]
+    current_span().set(profiles=list(profiles), captions=len(captions_texts))
+
+    width, height = get_video_size(video_path)
+    audio_duration = float(mediainfo(audio_path)["duration"])
+
+    command = [get_ffmpeg_binary(), "-y", "-v", "error", "-stream_loop", "-1", "-i", video_path, "-i", audio_path]
+    filters = []
+    label = "0:v"
+    if captions_texts:
+        safe_width, safe_height = caption_safe_area(width, height, profiles.values())
+        caption_bottom = (height + safe_height) // 2 - safe_height // 20
+        font_size = max(16, height // CAPTION_FONT_DIVISOR)
+        images = [rasterize_caption(text, int(safe_width * 0.9), font_size) for text in captions_texts]
+        for n, (image, (start, end)) in enumerate(zip(images, caption_windows(captions_texts, audio_duration))):
+            command += ["-i", image]
+            filters.append(
+                f"[{label}][{n + 2}:v]overlay=x=(W-w)/2:y={caption_bottom}-h:"
+                f"enable='between(t,{start:.3f},{end:.3f})'[c{n + 1}]"
+            )
+            label = f"c{n + 1}"
+
+    branches = [f"[b{n}]" for n in range(len(profiles))]
+    filters.append(f"[{label}]split={len(profiles)}{''.join(branches)}")
+    for n, profile in enumerate(profiles.values()):
+        filters.append(f"{branches[n]}{profile_filter(profile)}[o{n}]")
+    command += ["-filter_complex", ";".join(filters)]
+
+    for n, (name, profile) in enumerate(profiles.items()):
+        command += [
+            "-map", f"[o{n}]", "-map", "1:a:0",
+            "-c:v", "libx264", "-preset", profile["preset"], "-crf", str(profile["crf"]), "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", profile["audio_bitrate"],
+            "-t", f"{audio_duration:.3f}",
+            "-movflags", "+faststart",
+        ]
+        if threads:
+            command += ["-threads", str(threads)]
+        command.append(output_paths[name])
+
+    try:
+        run_ffmpeg(command, audio_duration, progress_callback)
+    except BaseException:
+        for path in output_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    current_span().set(bytes=sum(os.path.getsize(path) for path in output_paths.values()))
+    return dict(output_paths)
+
+
 # Function to get today's date in YYYY-MM-DD format
 def get_today_date():
     """
@@ -274,14 +1203,122 @@ def delete_file(file_path):
     return False
 
 
+# Resolve the chromedriver binary once per process
+def get_chromedriver_path():
+    """
+    Get the path of the chromedriver binary.
+
+    Features:
+    - Runs webdriver_manager's resolution (and download, if needed) only once per process.
+
+    Parameters:
+    None
+
+    Returns:
+    str: Path to the chromedriver binary.
+    """
+    global _chromedriver_path
+    with _driver_setup_lock:
+        if _chromedriver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            from webdriver_manager.core.os_manager import ChromeType
+
+            if not DEV_MODE:
+                _chromedriver_path = ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+            else:
+                _chromedriver_path = ChromeDriverManager().install()
+        return _chromedriver_path
+
+
+# Pick a random User-Agent from a dataset loaded once per process
+def get_random_user_agent():
+    """
+    Get a random browser User-Agent string.
+
+    Features:
+    - Loads the fake_useragent dataset only on the first call.
+
+    Parameters:
+    None
+
+    Returns:
+    str: A User-Agent string.
+    """
+    global _user_agents
+    with _driver_setup_lock:
+        if _user_agents is None:
+            from fake_useragent import UserAgent
+
+            _user_agents = UserAgent()
+        return _user_agents.random
+
+
+# Claim a browser profile directory that no other running browser uses
+def claim_profile_dir():
+    """
+    Claim a reusable Chromium user-data directory.
+
+    Features:
+    - Reuses the directories of browsers that have exited, so caches and profile setup survive restarts.
+    - Holds a file lock per directory, so concurrent browsers (also from other processes) never share one.
+
+    Parameters:
+    None
+
+    Returns:
+    tuple: (slot number, directory path), or (None, None) if file locks are unavailable.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None, None
+
+    with _driver_setup_lock:
+        # Release the slots of browsers that have exited
+        for slot, (lock_file, driver) in list(_profile_slots.items()):
+            process = getattr(getattr(driver, "service", None), "process", None) if driver else None
+            if driver and (process is None or process.poll() is not None):
+                lock_file.close()
+                del _profile_slots[slot]
+
+        slot = 0
+        while True:
+            if slot not in _profile_slots:
+                directory = os.path.join(DRIVER_PROFILE_DIR, f"slot-{slot}")
+                os.makedirs(directory, exist_ok=True)
+                lock_file = open(os.path.join(directory, ".lock"), "w")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                else:
+                    _profile_slots[slot] = (lock_file, None)
+                    return slot, os.path.abspath(directory)
+            slot += 1
+
+
+# Record which browser owns a claimed profile slot, or give the slot back
+def _set_profile_owner(slot, driver):
+    with _driver_setup_lock:
+        lock_file, _ = _profile_slots.pop(slot)
+        if driver is None:
+            lock_file.close()
+        else:
+            _profile_slots[slot] = (lock_file, driver)
+
+
 # @st.cache_resource
+@traced()
 def init_driver():
     """
     Initialize a Selenium WebDriver instance.
 
     Features:
     - Configures Chrome options for headless execution.
-    - Dynamically fetches and configures the Chromium driver.
+    - Dynamically fetches and configures the Chromium driver (resolved once per process).
+    - Uses a lean profile: no images or web fonts, no ad or analytics scripts, "eager" page loads
+      and a reusable user-data directory.
+    - Records the launch time on the driver; get_audio_data reports the time to the first page.
 
     Parameters:
     None
@@ -289,10 +1326,14 @@ def init_driver():
     Returns:
     webdriver: Selenium WebDriver instance.
     """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    launch_started = time.monotonic()
 
     # Generate a random User-Agent
-    ua = UserAgent()
-    user_agent = ua.random
+    user_agent = get_random_user_agent()
     print(f"Using User-Agent: {user_agent}")
 
 
@@ -304,23 +1345,47 @@ def init_driver():
     chrome_options.add_argument("--mute-audio")
     chrome_options.add_argument(f"user-agent={user_agent}")
 
-   
+    # Skip work the TTS page does not need
+    chrome_options.page_load_strategy = DRIVER_PAGE_LOAD_STRATEGY
+    for argument in ("--no-first-run", "--no-default-browser-check", "--disable-extensions",
+                     "--disable-background-networking", "--disable-sync", "--disable-translate",
+                     "--disable-default-apps", "--blink-settings=imagesEnabled=false"):
+        chrome_options.add_argument(argument)
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+
+    slot, profile_dir = claim_profile_dir()
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
 
     if not DEV_MODE:
 
         chrome_options.add_argument("--no-sandbox")  # Needed for some cloud environments
         chrome_options.add_argument("--disable-dev-shm-usage")  # Prevents shared memory issues
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-         # Dynamically fetch and configure the Chromium driver
-        service = Service(
-            ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
-        )
 
-    else:
-        service = Service(ChromeDriverManager().install())
+    service = Service(get_chromedriver_path())
 
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        if slot is not None:
+            _set_profile_owner(slot, None)
+        raise
+    if slot is not None:
+        _set_profile_owner(slot, driver)
+
+    # Block fonts and third-party trackers at the network level (images are also off via prefs)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": DRIVER_BLOCKED_URLS})
+    except Exception as e:
+        print(f"Could not set blocked URLs: {e}")
 
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.launch_seconds = time.monotonic() - launch_started
+    driver.launch_started = launch_started
     return driver
 
 
@@ -332,8 +1397,8 @@ def load_video_metadata():
     Load or initialize video metadata.
 
     Features:
-    - Loads metadata from a JSON file.
-    - Initializes an empty dictionary if the file does not exist.
+    - Loads metadata from the metadata store.
+    - Returns an empty dictionary if no video has been recorded yet.
 
     Parameters:
     None
@@ -341,18 +1406,29 @@ def load_video_metadata():
     Returns:
     dict: Video metadata.
     """
-    if os.path.exists(VIDEO_METADATA_FILE):
-        with open(VIDEO_METADATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return get_metadata_store().video_records()
+
+# Function to get the metadata of one video
+def get_video_metadata(video_path):
+    """
+    Get the metadata of one video.
+
+    Parameters:
+    video_path (str): Path of the rendered video.
 
-# Function to save video metadata to the JSON file
+    Returns:
+    dict: The video's metadata, or an empty dictionary if none was recorded.
+    """
+    return get_metadata_store().get_video(video_path) or {}
+
+# Function to save video metadata to the metadata store
 def save_video_metadata(metadata):
     """
-    Save video metadata to a JSON file.
+    Save video metadata to the metadata store.
 
     Features:
-    - Writes metadata to a specified JSON file.
+    - Adds or replaces the given entries in one transaction.
+    - Never removes entries, so a stale copy cannot drop records saved by another session.
 
     Parameters:
     metadata (dict): The metadata to be saved.
@@ -360,32 +1436,79 @@ def save_video_metadata(metadata):
     Returns:
     None
     """
-    with open(VIDEO_METADATA_FILE, "w") as f:
-        json.dump(metadata, f, indent=4)
+    get_metadata_store().put_video(metadata)
 
-# Function to save audio metadata
-def save_audio_metadata(metadata, metadata_file="audio_metadata.json"):
+# Function to record a single video
+def add_video_metadata(video_path, record):
     """
-    Save audio metadata to a JSON file.
+    Add the metadata of one video.
 
     Features:
-    - Updates existing metadata with new data.
-    - Writes metadata to a specified JSON file.
+    - Appends a single record without loading the existing metadata.
 
     Parameters:
-    metadata (dict): The metadata to be saved.
-    metadata_file (str): The name of the file to save the metadata (default is "audio_metadata.json").
+    video_path (str): Path of the rendered video.
+    record (dict): The video's metadata.
 
     Returns:
     None
     """
-    if os.path.exists(metadata_file):
-        with open(metadata_file, "r") as f:
-            existing_metadata = json.load(f)
-    else:
-        existing_metadata = {}
+    get_metadata_store().put_video({video_path: record})
+
+# Function to load the audio metadata
+def load_audio_metadata():
+    """
+    Load audio metadata.
+
+    Features:
+    - Loads metadata from the metadata store.
 
-    existing_metadata.update(metadata)
+    Parameters:
+    None
+
+    Returns:
+    dict: Audio metadata, keyed by TTS audio path.
+    """
+    return get_metadata_store().audio_records()
 
-    with open(metadata_file, "w") as f:
-        json.dump(existing_metadata, f, indent=4)
\ No newline at end of file
+# Function to find the TTS record behind a mixed audio file
+def find_audio_metadata(final_audio_path):
+    """
+    Find the audio metadata of a mixed audio file.
+
+    Features:
+    - Uses the index maintained by merge_audio, so the lookup does not grow with history.
+    - Finds MP3 exports through the mix they were exported from.
+
+    Parameters:
+    final_audio_path (str): Path of the mixed audio file (e.g. output/audios/<name>.flac).
+
+    Returns:
+    dict: The record with quote, author, hindi_quote and tts_text, or None if the file is unknown.
+    """
+    store = get_metadata_store()
+    record = store.audio_for_final_path(final_audio_path)
+    stem = os.path.splitext(final_audio_path)[0]
+    for extension in AUDIO_EXTENSIONS.values():
+        if record is not None:
+            break
+        if stem + extension != final_audio_path:
+            record = store.audio_for_final_path(stem + extension)
+    return record
+
+# Function to save audio metadata
+def save_audio_metadata(metadata, metadata_file=None):
+    """
+    Save audio metadata to the metadata store.
+
+    Features:
+    - Adds or replaces the given entries in one transaction.
+
+    Parameters:
+    metadata (dict): The metadata to be saved.
+    metadata_file (str): Unused; kept for compatibility with callers of the JSON version.
+
+    Returns:
+    None
+    """
+    get_metadata_store().put_audio(metadata)
@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+METADATA_DB_FILE = "metadata.sqlite3"
+AUDIO_METADATA_FILE = "audio_metadata.json"  # Legacy JSON file, imported once
+VIDEO_METADATA_FILE = "video_metadata.json"  # Legacy JSON file, imported once
+METADATA_BUSY_TIMEOUT = 30  # seconds to wait for another writer
+LEGACY_FINAL_AUDIO_DIR = os.path.join("output", "audios")
+
+
+def final_audio_key(path):
+    """
+    Normalize a mixed audio path for lookups.
+
+    Parameters:
+    path (str): Path of the mixed audio.
+
+    Returns:
+    str: Normalized path.
+    """
+    return os.path.normpath(path)
+
+
+class MetadataStore:
+    """
+    Embedded store for audio and video metadata.
+
+    Features:
+    - Keeps one row per file in SQLite (WAL mode), so a write touches only its own record.
+    - Readers in other sessions and processes are never blocked by a writer.
+    - Imports the legacy JSON metadata files the first time it opens a database.
+
+    Parameters:
+    path (str): Path to the SQLite database file.
+    audio_json (str): Legacy audio metadata file to import.
+    video_json (str): Legacy video metadata file to import.
+    """
+
+    def __init__(self, path=METADATA_DB_FILE, audio_json=AUDIO_METADATA_FILE, video_json=VIDEO_METADATA_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=METADATA_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS audio ("
+                "path TEXT PRIMARY KEY, quote TEXT, author TEXT, tts_text TEXT, "
+                "data TEXT NOT NULL, created_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS audio_quote ON audio (quote)")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(audio)")]
+            if "final_audio_path" not in columns:
+                self._conn.execute("ALTER TABLE audio ADD COLUMN final_audio_path TEXT")
+                # Records written before the column existed were mixed into output/audios under the same name
+                for (path,) in self._conn.execute("SELECT path FROM audio").fetchall():
+                    self._conn.execute(
+                        "UPDATE audio SET final_audio_path = ? WHERE path = ?",
+                        (final_audio_key(os.path.join(LEGACY_FINAL_AUDIO_DIR, os.path.basename(path))), path),
+                    )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS audio_final_audio_path ON audio (final_audio_path)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS video ("
+                "path TEXT PRIMARY KEY, title TEXT, audio_file TEXT, date_created TEXT, "
+                "data TEXT NOT NULL, created_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS video_date_created ON video (date_created)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY, imported_at REAL)")
+        self._import_json("audio", audio_json)
+        self._import_json("video", video_json)
+
+    def _import_json(self, table, json_file):
+        if not json_file or not os.path.exists(json_file):
+            return
+        with self._lock, self._conn:
+            # BEGIN IMMEDIATE makes concurrent first starts import the file exactly once
+            self._conn.execute("BEGIN IMMEDIATE")
+            source = os.path.abspath(json_file)
+            if self._conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+                return
+            try:
+                with open(json_file, "r") as f:
+                    records = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping metadata import from {json_file}: {e}")
+                records = {}
+            put = self._put_audio if table == "audio" else self._put_video
+            for path, record in records.items():
+                put(path, record, replace=False)
+            self._conn.execute("INSERT INTO imports (source, imported_at) VALUES (?, ?)", (source, time.time()))
+            print(f"Imported {len(records)} {table} metadata records from {json_file}")
+
+    def _put_audio(self, path, record, replace=True):
+        final_audio_path = None
+        if not replace:
+            # Imported records follow the legacy output/audios naming
+            final_audio_path = final_audio_key(os.path.join(LEGACY_FINAL_AUDIO_DIR, os.path.basename(path)))
+        self._conn.execute(
+            "INSERT INTO audio (path, quote, author, tts_text, data, created_at, final_audio_path) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (path) DO "
+            + ("UPDATE SET quote = excluded.quote, author = excluded.author, tts_text = excluded.tts_text, "
+               "data = excluded.data" if replace else "NOTHING"),
+            (path, record.get("quote"), record.get("author"), record.get("tts_text"),
+             json.dumps(record, ensure_ascii=False), time.time(), final_audio_path),
+        )
+
+    def _put_video(self, path, record, replace=True):
+        self._conn.execute(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO video "
+            "(path, title, audio_file, date_created, data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, record.get("title"), record.get("audio_file"), record.get("date_created"),
+             json.dumps(record, ensure_ascii=False), time.time()),
+        )
+
+    def put_audio(self, records):
+        """
+        Add or replace audio records in one transaction.
+
+        Parameters:
+        records (dict): TTS audio path → record (quote, author, hindi_quote, tts_text).
+
+        Returns:
+        None
+        """
+        with self._lock, self._conn:
+            for path, record in records.items():
+                self._put_audio(path, record)
+
+    def put_video(self, records):
+        """
+        Add or replace video records in one transaction.
+
+        Parameters:
+        records (dict): Video path → record (title, description, hashtags, ...).
+
+        Returns:
+        None
+        """
+        with self._lock, self._conn:
+            for path, record in records.items():
+                self._put_video(path, record)
+
+    def _records(self, table, where="", args=()):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT path, data FROM {table} {where} ORDER BY rowid", args).fetchall()
+        return {path: json.loads(data) for path, data in rows}
+
+    def audio_records(self):
+        """
+        Get all audio records.
+
+        Returns:
+        dict: TTS audio path → record, in insertion order.
+        """
+        return self._records("audio")
+
+    def video_records(self):
+        """
+        Get all video records.
+
+        Returns:
+        dict: Video path → record, in insertion order.
+        """
+        return self._records("video")
+
+    def link_final_audio(self, tts_audio_path, final_audio_path):
+        """
+        Record which mixed file was produced from a TTS track.
+
+        Features:
+        - Moves the link if another record pointed at the same mixed file before.
+
+        Parameters:
+        tts_audio_path (str): TTS audio path the audio record is keyed by.
+        final_audio_path (str): Path of the mixed audio.
+
+        Returns:
+        None
+        """
+        key = final_audio_key(final_audio_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE audio SET final_audio_path = NULL WHERE final_audio_path = ? AND path != ?",
+                (key, tts_audio_path),
+            )
+            self._conn.execute(
+                "INSERT INTO audio (path, data, created_at, final_audio_path) VALUES (?, '{}', ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET final_audio_path = excluded.final_audio_path",
+                (tts_audio_path, time.time(), key),
+            )
+
+    def audio_for_final_path(self, final_audio_path):
+        """
+        Look up the TTS record behind a mixed audio file.
+
+        Parameters:
+        final_audio_path (str): Path of the mixed audio.
+
+        Returns:
+        dict: The audio record (quote, author, hindi_quote, tts_text) plus the tts_audio_path it is keyed by,
+            or None if the file is unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, data FROM audio WHERE final_audio_path = ? ORDER BY rowid DESC LIMIT 1",
+                (final_audio_key(final_audio_path),),
+            ).fetchone()
+        return dict(json.loads(row[1]), tts_audio_path=row[0]) if row else None
+
+    def get_video(self, path):
+        """
+        Get one video record.
+
+        Parameters:
+        path (str): Video path.
+
+        Returns:
+        dict: The record, or None if there is none.
+        """
+        return self._records("video", "WHERE path = ?", (path,)).get(path)
+
+    def used_quotes(self):
+        """
+        Get the quotes that were already turned into audio.
+
+        Returns:
+        list: Quote texts.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT quote FROM audio WHERE quote IS NOT NULL").fetchall()
+        return [row[0] for row in rows]
+
+
+_metadata_store = None
+_metadata_store_lock = threading.Lock()
+
+
+def get_metadata_store():
+    """
+    Get the process-wide metadata store.
+
+    Returns:
+    MetadataStore: Shared metadata store instance.
+    """
+    global _metadata_store
+    with _metadata_store_lock:
+        if _metadata_store is None:
+            _metadata_store = MetadataStore()
+        return _metadata_store
@@ -0,0 +1,418 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from functions import (
+    MIX_FORMAT,
+    RENDER_PROFILES,
+    add_video_metadata,
+    create_video_with_audio,
+    delete_file,
+    export_mp3,
+    get_quote,
+    get_today_date,
+    merge_audio,
+    profile_output_path,
+    render_formats,
+    save_audio_metadata,
+    synthesize_speech,
+    translate_to_hindi
+)
+from driver_pool import DRIVER_POOL_MAX_SIZE
+from caches import text_key
+from quote_source import normalize_quote
+from resilience import Deadline
+from tracing import span
+
+PIPELINE_QUEUE_SIZE = 2  # Items waiting in front of each stage before upstream blocks
+NETWORK_WORKERS = 3
+TTS_WORKERS = DRIVER_POOL_MAX_SIZE
+MERGE_WORKERS = 2
+RENDER_WORKERS = 1
+QUOTE_ID_LENGTH = 8  # hex digits of the quote hash in audio file names
+QUOTE_BUDGET = 180  # seconds for fetching, translating and synthesizing one quote
+# Share of the quote budget each stage gets, counted from when the stage starts work on the item
+STAGE_BUDGET_SHARES = {"quote": 0.15, "translate": 0.15, "tts": 0.7}
+
+_STOP = object()
+
+
+class StageError(Exception):
+    """Raised by a stage function when an item cannot continue through the pipeline."""
+
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    Parameters:
+    name (str): Stage name reported in events.
+    func (callable): Function taking an item dict and returning the updated item dict.
+    workers (int): Number of items processed concurrently by this stage.
+    kind (str): "thread" for I/O-bound work, "process" for CPU-bound work (func must be picklable).
+    """
+
+    def __init__(self, name, func, workers=1, kind="thread"):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.kind = kind
+
+
+class Pipeline:
+    """
+    Run items through a chain of stages concurrently.
+
+    Features:
+    - Each stage has its own worker pool (threads, or processes for CPU-bound stages).
+    - A bounded queue in front of every stage applies backpressure to the stage before it.
+    - Progress is reported as events on the calling thread, so UI updates stay on the script thread.
+
+    Parameters:
+    stages (list): List of Stage objects, in order.
+    queue_size (int): Capacity of the queue in front of each stage.
+    """
+
+    def __init__(self, stages, queue_size=PIPELINE_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items):
+        """
+        Process items and yield progress events as they happen.
+
+        Features:
+        - Yields {"index", "stage", "status", "item", "error", "elapsed"} dicts.
+        - status is "started" or "done" per stage, then "completed" or "failed" once per item.
+
+        Parameters:
+        items (list): List of item dicts; each gets an "index" key if it has none.
+
+        Returns:
+        generator: Progress events.
+        """
+        items = list(items)
+        for index, item in enumerate(items):
+            item.setdefault("index", index)
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        events = queue.Queue()
+        executors = {}
+        for stage in self.stages:
+            if stage.kind == "process":
+                executors[stage.name] = ProcessPoolExecutor(
+                    max_workers=stage.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+
+        remaining_workers = [stage.workers for stage in self.stages]
+        counter_lock = threading.Lock()
+
+        def worker(position):
+            stage = self.stages[position]
+            while True:
+                item = queues[position].get()
+                if item is _STOP:
+                    break
+                events.put({"index": item["index"], "stage": stage.name, "status": "started", "item": item})
+                start = time.perf_counter()
+                try:
+                    # Process stages are timed from here, so the span includes the hand-off to the worker
+                    with span(f"stage.{stage.name}", index=item["index"], kind=stage.kind):
+                        if stage.kind == "process":
+                            item = executors[stage.name].submit(stage.func, item).result()
+                        else:
+                            item = stage.func(item)
+                except Exception as e:
+                    events.put({"index": item["index"], "stage": stage.name, "status": "failed",
+                                "item": item, "error": str(e) or e.__class__.__name__,
+                                "elapsed": time.perf_counter() - start})
+                    continue
+                events.put({"index": item["index"], "stage": stage.name, "status": "done",
+                            "item": item, "elapsed": time.perf_counter() - start})
+                if position + 1 < len(self.stages):
+                    queues[position + 1].put(item)
+                else:
+                    events.put({"index": item["index"], "stage": stage.name, "status": "completed", "item": item})
+
+            # The last worker of a stage tells the next stage that no more items are coming
+            with counter_lock:
+                remaining_workers[position] -= 1
+                last = remaining_workers[position] == 0
+            if last and position + 1 < len(self.stages):
+                for _ in range(self.stages[position + 1].workers):
+                    queues[position + 1].put(_STOP)
+
+        def feeder():
+            for item in items:
+                queues[0].put(item)
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_STOP)
+
+        threads = [threading.Thread(target=feeder, daemon=True)]
+        for position, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=worker, args=(position,), daemon=True) for _ in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        def cleanup():
+            for thread in threads:
+                thread.join()
+            for executor in executors.values():
+                executor.shutdown()
+
+        finished = 0
+        try:
+            while finished < len(items):
+                event = events.get()
+                if event["status"] in ("completed", "failed"):
+                    finished += 1
+                yield event
+        finally:
+            # If the consumer stopped early, let the workers drain in the background
+            if finished == len(items):
+                cleanup()
+            else:
+                threading.Thread(target=cleanup, daemon=True).start()
+
+
+def stage_deadline(item, stage):
+    """
+    Start a stage's share of an item's latency budget.
+
+    Features:
+    - Called when the stage begins work, so time spent waiting in the queue in front of it
+      does not count against the item.
+
+    Parameters:
+    item (dict): Pipeline item; item["quote_budget"] overrides QUOTE_BUDGET.
+    stage (str): Stage name in STAGE_BUDGET_SHARES.
+
+    Returns:
+    Deadline: The stage's budget, starting now.
+    """
+    return Deadline(item.get("quote_budget", QUOTE_BUDGET) * STAGE_BUDGET_SHARES[stage])
+
+
+# Stages of the quote-to-audio pipeline
+def fetch_quote_stage(item):
+    """
+    Fetch a quote and derive the TTS file name.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Item with quote, author, quote_id and tts_audio_path (unique per quote).
+    """
+    quote, author = get_quote(deadline=stage_deadline(item, "quote"))
+    if not quote or not author:
+        raise StageError("Failed to fetch quote")
+    # Safe file name for audio file; the quote hash keeps two quotes by one author on one day apart
+    safe_author_name = author.replace(" ", "_").replace(",", "").replace(".", "")
+    quote_id = text_key(normalize_quote(quote))[:QUOTE_ID_LENGTH]
+    item.update(
+        quote=quote,
+        author=author,
+        safe_author_name=safe_author_name,
+        quote_id=quote_id,
+        tts_audio_path=f"{safe_author_name}_{get_today_date()}_{quote_id}_tts_audio.mp3",
+    )
+    return item
+
+
+def translate_stage(item):
+    """
+    Translate the quote and build the TTS text.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Item with hindi_quote and tts_text.
+    """
+    hindi_quote = translate_to_hindi(item["quote"], deadline=stage_deadline(item, "translate"))
+    if not hindi_quote:
+        raise StageError("Failed to translate quote")
+    item.update(
+        hindi_quote=hindi_quote,
+        tts_text=f'{item["author"]} says "{item["quote"]}"\nहिंदी में\n"{hindi_quote}"',
+    )
+    return item
+
+
+def tts_stage(item):
+    """
+    Synthesize the TTS text to the item's MP3 file.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Unchanged item.
+    """
+    deadline = stage_deadline(item, "tts")
+    if not synthesize_speech(item["tts_text"], item["tts_audio_path"], deadline=deadline):
+        raise StageError("Failed to generate audio")
+    return item
+
+
+def save_metadata_stage(item):
+    """
+    Record the quote, author and TTS text of the item's audio.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Unchanged item.
+    """
+    save_audio_metadata({
+        item["tts_audio_path"]: {
+            "quote": item["quote"],
+            "author": item["author"],
+            "hindi_quote": item["hindi_quote"],
+            "tts_text": item["tts_text"]
+        }
+    })
+    return item
+
+
+def merge_stage(item):
+    """
+    Mix the item's TTS audio with a background track.
+
+    Features:
+    - Uses the item's background_audio_path if set, otherwise a random template.
+    - Writes the mix in item["audio_format"] (default MIX_FORMAT, lossless) and also exports
+      an MP3 when item["export_mp3"] is set.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Item with final_audio_path, and mp3_path when an MP3 was exported.
+    """
+    final_audio_path = merge_audio(
+        item["tts_audio_path"],
+        background_audio_path=item.get("background_audio_path"),
+        audio_format=item.get("audio_format", MIX_FORMAT),
+    )
+    if not final_audio_path:
+        raise StageError("Failed to merge audio")
+    item["final_audio_path"] = final_audio_path
+    if item.get("export_mp3"):
+        item["mp3_path"] = export_mp3(final_audio_path)
+    return item
+
+
+def render_video_stage(item):
+    """
+    Render the item's mixed audio over its video template.
+
+    Features:
+    - Renders every profile in item["render_profiles"] from one decode pass when it is set.
+
+    Parameters:
+    item (dict): Pipeline item with video_template_path and video_output_dir.
+
+    Returns:
+    dict: Item with final_video_paths (profile name → path, None for the template's own format)
+        and final_video_path (the first of them).
+    """
+    output_dir = item.get("video_output_dir", os.path.join("output", "videos"))
+    os.makedirs(output_dir, exist_ok=True)
+    # Named per quote like the audio, so a later run on the same day never overwrites these videos
+    video_path = os.path.join(output_dir, f"{item['safe_author_name']}_{get_today_date()}_{item['quote_id']}.mp4")
+    if item.get("render_profiles"):
+        output_paths = {profile: profile_output_path(video_path, profile) for profile in item["render_profiles"]}
+        item["final_video_paths"] = render_formats(
+            item["video_template_path"], item["final_audio_path"], output_paths, [item["tts_text"]]
+        )
+    else:
+        item["final_video_paths"] = {None: create_video_with_audio(
+            item["video_template_path"], item["final_audio_path"], video_path, [item["tts_text"]]
+        )}
+    item["final_video_path"] = next(iter(item["final_video_paths"].values()))
+    return item
+
+
+def save_video_metadata_stage(item):
+    """
+    Record the rendered videos in the video metadata, one entry per format.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Unchanged item.
+    """
+    for profile, video_path in item["final_video_paths"].items():
+        record = {
+            "title": item["author"],
+            "description": item["quote"],
+            "hashtags": [],
+            "audio_file": os.path.basename(item["final_audio_path"]),
+            "video_file": os.path.basename(item["video_template_path"]),
+            "date_created": get_today_date()
+        }
+        if profile:
+            record.update(profile=profile, aspect=RENDER_PROFILES[profile]["aspect"])
+        add_video_metadata(video_path, record)
+    return item
+
+
+def delete_tts_stage(item):
+    """
+    Delete the item's TTS file once its video is rendered.
+
+    Features:
+    - The mix and the TTS cache keep the audio, so the intermediate MP3 in the working directory
+      is no longer needed.
+
+    Parameters:
+    item (dict): Pipeline item.
+
+    Returns:
+    dict: Unchanged item.
+    """
+    if delete_file(item["tts_audio_path"]):
+        print(f"Successfully deleted the audio file: {item['tts_audio_path']}")
+    return item
+
+
+def build_audio_pipeline(network_workers=NETWORK_WORKERS, tts_workers=TTS_WORKERS, merge_workers=MERGE_WORKERS,
+                         queue_size=PIPELINE_QUEUE_SIZE, render_video=False, render_workers=RENDER_WORKERS):
+    """
+    Build the quote → translate → TTS → metadata → merge pipeline.
+
+    Features:
+    - Optionally appends video rendering, video metadata and TTS file cleanup stages.
+
+    Parameters:
+    network_workers (int): Concurrent quote fetches and translations.
+    tts_workers (int): Concurrent TTS sessions (bounded by the driver pool size).
+    merge_workers (int): Worker processes for mixing.
+    queue_size (int): Capacity of the queue in front of each stage.
+    render_video (bool): Also render each item's video (items need video_template_path).
+    render_workers (int): Worker processes for video rendering.
+
+    Returns:
+    Pipeline: Configured pipeline.
+    """
+    stages = [
+        Stage("quote", fetch_quote_stage, workers=network_workers),
+        Stage("translate", translate_stage, workers=network_workers),
+        Stage("tts", tts_stage, workers=tts_workers),
+        Stage("metadata", save_metadata_stage, workers=1),
+        Stage("merge", merge_stage, workers=merge_workers, kind="process"),
+    ]
+    if render_video:
+        stages += [
+            Stage("video", render_video_stage, workers=render_workers, kind="process"),
+            Stage("video_metadata", save_video_metadata_stage, workers=1),
+            Stage("cleanup", delete_tts_stage, workers=1),
+        ]
+    return Pipeline(stages, queue_size=queue_size)
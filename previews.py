@@ -0,0 +1,177 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from caches import CACHE_DIR, text_key
+from functions import get_ffmpeg_binary
+
+PREVIEW_CACHE_DIR = os.path.join(CACHE_DIR, "previews")
+PREVIEW_WORKERS = 2
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_OFFSET = 1.0  # seconds into the video
+WAVEFORM_SIZE = "640x80"
+WAVEFORM_COLOR = "#4a90d9"
+
+
+def make_thumbnail(video_path, image_path):
+    """
+    Extract one frame of a video as a small PNG.
+
+    Features:
+    - Seeks THUMBNAIL_OFFSET seconds in, falling back to the first frame for shorter clips.
+
+    Parameters:
+    video_path (str): Path to the video file.
+    image_path (str): Path of the PNG to write.
+
+    Returns:
+    bool: True if the image was written.
+    """
+    for offset in (THUMBNAIL_OFFSET, 0):
+        subprocess.run(
+            [get_ffmpeg_binary(), "-y", "-v", "error", "-ss", str(offset), "-i", video_path,
+             "-frames:v", "1", "-vf", f"scale={THUMBNAIL_WIDTH}:-2", image_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if os.path.exists(image_path) and os.path.getsize(image_path):
+            return True
+    return False
+
+
+def make_waveform(audio_path, image_path):
+    """
+    Draw the waveform of an audio file as a PNG.
+
+    Parameters:
+    audio_path (str): Path to the audio file.
+    image_path (str): Path of the PNG to write.
+
+    Returns:
+    bool: True if the image was written.
+    """
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-y", "-v", "error", "-i", audio_path,
+         "-filter_complex", f"showwavespic=s={WAVEFORM_SIZE}:split_channels=0:colors={WAVEFORM_COLOR}",
+         "-frames:v", "1", image_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0 and os.path.exists(image_path)
+
+
+class PreviewGenerator:
+    """
+    Background generator of thumbnails and waveform images.
+
+    Features:
+    - Caches one PNG per media file, keyed by path, size and modification time.
+    - Generates missing previews in a small thread pool and never blocks the caller.
+    - Queues each missing preview only once and does not retry failures; failed() reports them.
+
+    Parameters:
+    directory (str): Directory holding the preview images.
+    workers (int): Number of background workers.
+    """
+
+    def __init__(self, directory=PREVIEW_CACHE_DIR, workers=PREVIEW_WORKERS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._pending = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def path_for(self, media_path):
+        """
+        Get the cache path of a media file's preview.
+
+        Parameters:
+        media_path (str): Path to the audio or video file.
+
+        Returns:
+        str: Path of the preview PNG.
+        """
+        stat = os.stat(media_path)
+        key = text_key(os.path.abspath(media_path), str(stat.st_size), str(stat.st_mtime_ns))
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, media_path):
+        """
+        Get the preview of a media file, queueing its generation if it is missing.
+
+        Features:
+        - Videos get a thumbnail, audio files a waveform.
+
+        Parameters:
+        media_path (str): Path to the audio or video file.
+
+        Returns:
+        str: Path of the preview PNG, or None while it is being generated.
+        """
+        try:
+            image_path = self.path_for(media_path)
+        except OSError:
+            return None
+        if os.path.exists(image_path):
+            return image_path
+        with self._lock:
+            if image_path not in self._pending and image_path not in self._failed:
+                self._pending.add(image_path)
+                self._executor.submit(self._generate, media_path, image_path)
+        return None
+
+    def failed(self, media_path):
+        """
+        Check whether a media file's preview could not be generated.
+
+        Parameters:
+        media_path (str): Path to the audio or video file.
+
+        Returns:
+        bool: True if generation failed or the file cannot be read, False if it is ready or pending.
+        """
+        try:
+            image_path = self.path_for(media_path)
+        except OSError:
+            return True
+        with self._lock:
+            return image_path in self._failed
+
+    def _generate(self, media_path, image_path):
+        tmp_path = f"{image_path[:-len('.png')]}.{threading.get_ident()}.tmp.png"
+        make = make_thumbnail if media_path.endswith(".mp4") else make_waveform
+        created = False
+        try:
+            created = make(media_path, tmp_path)
+            if created:
+                os.replace(tmp_path, image_path)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Preview generation raised for {media_path}: {e}")
+            created = False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                if not created:
+                    self._failed.add(image_path)
+                self._pending.discard(image_path)
+        if not created:
+            print(f"Could not create a preview for {media_path}")
+
+
+_preview_generator = None
+_preview_generator_lock = threading.Lock()
+
+
+def get_preview_generator():
+    """
+    Get the process-wide preview generator.
+
+    Returns:
+    PreviewGenerator: Shared preview generator instance.
+    """
+    global _preview_generator
+    with _preview_generator_lock:
+        if _preview_generator is None:
+            _preview_generator = PreviewGenerator()
+        return _preview_generator
@@ -0,0 +1,257 @@
+import json
+import random
+import threading
+from collections import deque
+
+from metadata_store import get_metadata_store
+from resilience import CircuitOpen, DeadlineExceeded, call_timeout, get_circuit_breaker
+from tracing import current_span, span
+
+QUOTES_API_URL = "https://zenquotes.io/api/quotes"
+QUOTES_FILE = None  # Path to a local JSON quote file, used instead of the API when set
+LOW_WATER_MARK = 5
+REQUEST_TIMEOUT = (5, 15)  # (connect, read) seconds
+
+
+def normalize_quote(quote):
+    """
+    Normalize a quote for duplicate detection.
+
+    Features:
+    - Collapses whitespace and ignores case.
+
+    Parameters:
+    quote (str): The quote text.
+
+    Returns:
+    str: Normalized quote text.
+    """
+    return " ".join(quote.split()).casefold()
+
+
+def load_used_quotes(metadata_store=None):
+    """
+    Load the quotes that were already turned into audio.
+
+    Features:
+    - Reads the audio records written by save_audio_metadata.
+
+    Parameters:
+    metadata_store (MetadataStore): Store to read, None for the shared store.
+
+    Returns:
+    set: Normalized quotes that have already been used.
+    """
+    store = metadata_store or get_metadata_store()
+    return {normalize_quote(quote) for quote in store.used_quotes()}
+
+
+class QuoteBuffer:
+    """
+    Local buffer of quotes filled in bulk.
+
+    Features:
+    - Fetches a whole batch of quotes per network round trip (or reads a local quote file).
+    - Refills in a background thread once the buffer drops below the low-water mark.
+    - Drops quotes that are already recorded in the audio metadata or were handed out before.
+
+    Parameters:
+    url (str): Batch endpoint returning a JSON list of {"q": ..., "a": ...} objects.
+    quote_file (str): Local JSON file in the same format, used instead of the URL when set.
+    low_water (int): Buffer size below which a background refill is started.
+    metadata_store (MetadataStore): Store used to skip quotes that were already used, None for the shared store.
+    timeout (tuple): (connect, read) timeouts for the batch request.
+    session (requests.Session): Optional session to reuse connections, created on the first fetch otherwise.
+    """
+
+    def __init__(self, url=QUOTES_API_URL, quote_file=QUOTES_FILE, low_water=LOW_WATER_MARK,
+                 metadata_store=None, timeout=REQUEST_TIMEOUT, session=None):
+        self.url = url
+        self.quote_file = quote_file
+        self.low_water = low_water
+        self.timeout = timeout
+        self.session = session
+        self._buffer = deque()
+        self._seen = load_used_quotes(metadata_store)
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._refill_thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def _fetch_batch(self, deadline=None):
+        if self.quote_file:
+            with open(self.quote_file, "r") as f:
+                data = json.load(f)
+            random.shuffle(data)
+            return data
+        import requests
+
+        if self.session is None:
+            self.session = requests.Session()
+        connect_timeout, read_timeout = self.timeout
+        timeout = (call_timeout(deadline, connect_timeout, "the quote request"),
+                   call_timeout(deadline, read_timeout, "the quote request"))
+        breaker = get_circuit_breaker("quotes")
+        breaker.allow()
+        try:
+            response = self.session.get(self.url, timeout=timeout)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        current_span().set(bytes=len(response.content), http_status=response.status_code)
+        if response.status_code != 200:
+            breaker.record_failure()
+            return []
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        # An error page or a rate-limit message in place of the quote list is a failed fetch too
+        if not isinstance(data, list):
+            breaker.record_failure()
+            raise ValueError(f"Unexpected quote API response: {response.text[:100]!r}")
+        breaker.record_success()
+        return data
+
+    def refill(self, min_size=None, deadline=None):
+        """
+        Fetch one batch of quotes and add the unseen ones to the buffer.
+
+        Features:
+        - Fails fast without a request while the quote API's circuit breaker is open.
+
+        Parameters:
+        min_size (int): Skip the fetch if the buffer already holds this many quotes.
+        deadline (Deadline): Budget capping the request timeouts, None for the default timeouts only.
+
+        Returns:
+        int: Number of quotes added.
+        """
+        import requests
+
+        # Only one refill at a time; a caller that waited on another refill reuses its result
+        with self._refill_lock:
+            if min_size is not None and len(self) >= min_size:
+                return 0
+            with span("quote_refill") as trace:
+                try:
+                    batch = self._fetch_batch(deadline)
+                except (requests.RequestException, OSError, ValueError, CircuitOpen, DeadlineExceeded) as e:
+                    print(f"Quote refill failed: {e}")
+                    trace.set(status="failed", reason=str(e)[:200])
+                    return 0
+                trace.set(quotes=len(batch))
+
+            added = 0
+            with self._lock:
+                for item in batch:
+                    if not isinstance(item, dict):
+                        continue
+                    quote, author = item.get("q"), item.get("a")
+                    if not quote or not author:
+                        continue
+                    key = normalize_quote(quote)
+                    if key in self._seen:
+                        continue
+                    self._seen.add(key)
+                    self._buffer.append((quote, author))
+                    added += 1
+            return added
+
+    def _refill_in_background(self):
+        with self._lock:
+            if self._refill_thread is not None and self._refill_thread.is_alive():
+                return
+            self._refill_thread = threading.Thread(target=self.refill, args=(self.low_water,), daemon=True)
+            self._refill_thread.start()
+
+    def prefetch(self, count):
+        """
+        Make sure at least `count` quotes are buffered.
+
+        Parameters:
+        count (int): Number of quotes needed.
+
+        Returns:
+        int: Number of quotes currently buffered.
+        """
+        while len(self) < count:
+            if not self.refill(min_size=count) and len(self) < count:
+                break
+        return len(self)
+
+    def get(self, deadline=None):
+        """
+        Take the next unused quote from the buffer.
+
+        Features:
+        - Refills synchronously when the buffer is empty.
+        - Starts a background refill when the buffer runs low.
+
+        Parameters:
+        deadline (Deadline): Budget for a synchronous refill, None for the default timeouts only.
+
+        Returns:
+        tuple: (quote, author) if available, (None, None) otherwise.
+        """
+        if not len(self):
+            self.refill(min_size=1, deadline=deadline)
+        with self._lock:
+            item = self._buffer.popleft() if self._buffer else (None, None)
+            remaining = len(self._buffer)
+        if remaining < self.low_water:
+            self._refill_in_background()
+        return item
+
+    def take(self, count):
+        """
+        Take up to `count` quotes, fetching only as many batches as needed.
+
+        Parameters:
+        count (int): Number of quotes to take.
+
+        Returns:
+        list: List of (quote, author) tuples.
+        """
+        self.prefetch(count)
+        quotes = []
+        for _ in range(count):
+            quote, author = self.get()
+            if not quote:
+                break
+            quotes.append((quote, author))
+        return quotes
+
+    def mark_used(self, quote):
+        """
+        Record a quote as used so it is never handed out again.
+
+        Parameters:
+        quote (str): The quote text.
+
+        Returns:
+        None
+        """
+        with self._lock:
+            self._seen.add(normalize_quote(quote))
+
+
+_quote_buffer = None
+_quote_buffer_lock = threading.Lock()
+
+
+def get_quote_buffer():
+    """
+    Get the process-wide quote buffer.
+
+    Returns:
+    QuoteBuffer: Shared quote buffer instance.
+    """
+    global _quote_buffer
+    with _quote_buffer_lock:
+        if _quote_buffer is None:
+            _quote_buffer = QuoteBuffer()
+        return _quote_buffer
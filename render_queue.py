@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from functions import RenderCancelled, create_video_with_audio, profile_output_path, render_formats
+
+RENDER_THREADS_PER_JOB = 2  # Encoder threads given to each render
+
+
+def _render_job(job_id, status, cancel_flags, video_path, audio_path, output_path, captions_texts, threads,
+                profiles=None):
+    """
+    Render one video inside a worker process.
+
+    Features:
+    - Publishes progress to the shared status dict.
+    - Stops the encoder when the job is flagged for cancellation.
+    - Renders all requested profiles in one pass when profiles are given.
+
+    Parameters:
+    job_id (str): Job identifier.
+    status (dict): Shared job status dict (multiprocessing manager proxy).
+    cancel_flags (dict): Shared dict of job ids whose cancellation was requested.
+    video_path (str): Path to the video file.
+    audio_path (str): Path to the audio file.
+    output_path (str): Path to save the final video.
+    captions_texts (list): List of text captions to be added to the video.
+    threads (int): Encoder threads for this job.
+    profiles (list): Render profile names, None for a single video in the template's own format.
+
+    Returns:
+    str: Path to the final video file, or a dict of profile name → path when profiles are given.
+    """
+    status[job_id] = dict(status[job_id], state="running", started=time.time())
+
+    def progress(fraction):
+        if cancel_flags.get(job_id):
+            raise RenderCancelled(job_id)
+        status[job_id] = dict(status[job_id], progress=fraction)
+
+    if profiles:
+        output_paths = {profile: profile_output_path(output_path, profile) for profile in profiles}
+        return render_formats(
+            video_path, audio_path, output_paths, captions_texts, threads=threads, progress_callback=progress
+        )
+    try:
+        return create_video_with_audio(
+            video_path, audio_path, output_path, captions_texts, threads=threads, progress_callback=progress
+        )
+    except RenderCancelled:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+
+class RenderQueue:
+    """
+    Queue of video renders executed by a fixed pool of worker processes.
+
+    Features:
+    - Sizes the pool so that workers × encoder threads matches the number of cores.
+    - Tracks job state (queued, running, done, failed, cancelled) and progress for polling.
+    - Cancels queued jobs immediately and running jobs by stopping their encoder.
+
+    Parameters:
+    workers (int): Number of worker processes, None to derive it from the core count.
+    threads_per_job (int): Encoder threads given to each render.
+    """
+
+    def __init__(self, workers=None, threads_per_job=RENDER_THREADS_PER_JOB):
+        self.threads_per_job = max(1, threads_per_job)
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.threads_per_job)
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._status = self._manager.dict()
+        self._cancel_flags = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, video_path, audio_path, output_path, captions_texts, on_done=None, profiles=None):
+        """
+        Queue a render.
+
+        Parameters:
+        video_path (str): Path to the video file.
+        audio_path (str): Path to the audio file.
+        output_path (str): Path to save the final video.
+        captions_texts (list): List of text captions to be added to the video.
+        on_done (callable): Called with the output path after a successful render (in a background thread),
+            or with a dict of profile name → path when profiles are given.
+        profiles (list): Render profile names to produce in one pass, None for a single render.
+
+        Returns:
+        str: Job identifier.
+        """
+        job_id = uuid.uuid4().hex
+        output_paths = [profile_output_path(output_path, profile) for profile in profiles or []] or [output_path]
+        self._status[job_id] = {
+            "state": "queued",
+            "progress": 0.0,
+            "output_path": output_paths[0],
+            "output_paths": output_paths,
+            "error": None,
+            "submitted": time.time(),
+        }
+        future = self._executor.submit(
+            _render_job, job_id, self._status, self._cancel_flags,
+            video_path, audio_path, output_path, captions_texts, self.threads_per_job, profiles,
+        )
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_done))
+        return job_id
+
+    def _finish(self, job_id, future, on_done):
+        update = {"finished": time.time()}
+        try:
+            output_path = future.result()
+        except (CancelledError, RenderCancelled):
+            update["state"] = "cancelled"
+        except Exception as e:
+            update.update(state="failed", error=str(e) or e.__class__.__name__)
+        else:
+            update.update(state="done", progress=1.0)
+            if on_done:
+                try:
+                    on_done(output_path)
+                except Exception as e:
+                    print(f"Render {job_id} post-processing failed: {e}")
+        self._status[job_id] = dict(self._status[job_id], **update)
+        self._cancel_flags.pop(job_id, None)
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def status(self, job_id):
+        """
+        Get the status of a job.
+
+        Parameters:
+        job_id (str): Job identifier.
+
+        Returns:
+        dict: Job status, or None for an unknown job.
+        """
+        status = self._status.get(job_id)
+        return dict(status) if status else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        Parameters:
+        job_id (str): Job identifier.
+
+        Returns:
+        bool: True if the job was still queued or running.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None:
+            return False
+        if not future.cancel():
+            self._cancel_flags[job_id] = True
+        return True
+
+
+_render_queue = None
+_render_queue_lock = threading.Lock()
+
+
+def get_render_queue():
+    """
+    Get the process-wide render queue.
+
+    Returns:
+    RenderQueue: Shared render queue instance.
+    """
+    global _render_queue
+    with _render_queue_lock:
+        if _render_queue is None:
+            _render_queue = RenderQueue()
+        return _render_queue
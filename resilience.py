@@ -0,0 +1,167 @@
+import threading
+import time
+
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures that open a circuit
+CIRCUIT_RESET_TIMEOUT = 60  # seconds an open circuit fails fast before letting one trial call through
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call is started after its latency budget ran out."""
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class Deadline:
+    """
+    Latency budget shared by all the calls made for one item.
+
+    Features:
+    - Stores an absolute wall-clock expiry, so it can be pickled into worker processes.
+    - timeout() caps a per-call timeout by what is left of the budget.
+
+    Parameters:
+    seconds (float): Length of the budget from now.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.time() + seconds
+
+    @classmethod
+    def of(cls, value):
+        """
+        Turn a number of seconds into a Deadline, passing Deadlines and None through.
+
+        Parameters:
+        value (Deadline | float | None): Budget.
+
+        Returns:
+        Deadline: The deadline, or None for no budget.
+        """
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, limit=None, what="call"):
+        """
+        Get the timeout for the next call.
+
+        Parameters:
+        limit (float): Per-call timeout, None for no per-call limit.
+        what (str): Name of the call, used in the error message.
+
+        Returns:
+        float: The smaller of limit and the remaining budget.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"No time left for {what} ({self.seconds:.0f} s budget)")
+        return remaining if limit is None else min(limit, remaining)
+
+
+def call_timeout(deadline, limit, what="call"):
+    """
+    Get a call's timeout from an optional deadline.
+
+    Parameters:
+    deadline (Deadline): Budget of the current item, or None.
+    limit (float): Per-call timeout.
+    what (str): Name of the call, used in the error message.
+
+    Returns:
+    float: limit, capped by the deadline if there is one.
+    """
+    return deadline.timeout(limit, what) if deadline is not None else limit
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an external provider is down.
+
+    Features:
+    - Opens after `failure_threshold` consecutive failures; calls then raise CircuitOpen without waiting.
+    - After `reset_timeout` seconds one trial call is let through (half-open); its outcome closes or reopens it.
+
+    Parameters:
+    name (str): Provider name, used in messages.
+    failure_threshold (int): Consecutive failures that open the circuit.
+    reset_timeout (float): Seconds to stay open before the trial call.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._trial_running else "open"
+
+    def allow(self):
+        """
+        Check that a call may be made.
+
+        Returns:
+        None
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_timeout:
+                # Let one trial call through; the rest keep failing fast until it reports back or times out
+                self._opened_at = time.monotonic()
+                self._trial_running = True
+                return
+        raise CircuitOpen(f"{self.name} is unavailable, retrying in {max(0, self.reset_timeout - waited):.0f} s")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"{self.name} circuit closed.")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.failure_threshold):
+                print(f"{self.name} circuit opened after {self._failures} consecutive failures.")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """
+    Get the process-wide circuit breaker of a provider.
+
+    Parameters:
+    name (str): Provider name, e.g. "quotes", "translation" or "tts:crikk".
+
+    Returns:
+    CircuitBreaker: Shared breaker for that provider.
+    """
+    with _circuit_breakers_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(name)
+        return _circuit_breakers[name]
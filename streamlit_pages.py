@@ -1,21 +1,30 @@
 import os
-import json
+from datetime import datetime
+
 import streamlit as st
 
 from functions import (
-    get_quote,
-    load_video_metadata,
-    save_audio_metadata,
-    save_video_metadata, 
-    translate_to_hindi, 
-    get_audio_data, 
-    save_audio_to_mp3, 
-    merge_audio, 
-    create_video_with_audio, 
+    AUDIO_EXTENSIONS,
+    RENDER_PROFILES,
+    add_video_metadata,
+    export_mp3,
+    find_audio_metadata,
+    list_final_audio,
+    get_video_metadata,
     get_today_date, 
-    delete_file, 
-    init_driver
+    delete_file
 )
+from driver_pool import DRIVER_POOL_MAX_SIZE
+from pipeline import TTS_WORKERS, build_audio_pipeline
+from previews import get_preview_generator
+from quote_source import get_quote_buffer
+from render_queue import get_render_queue
+from templates import get_template_catalog, store_template_upload
+from tracing import TRACE_RECENT_SPANS, load_spans, stage_percentiles
+
+FILES_PER_PAGE = 10
+# Span fields shown as columns; everything else is listed under Details
+TRACE_BASE_FIELDS = {"span", "id", "parent", "root", "start", "duration", "status", "pid", "thread"}
 
 
 # Function to generate audio and save metadata
@@ -27,6 +36,7 @@ def generate_audio():
     - Generates TTS audio for the quotes.
     - Saves the audio and metadata.
     - Merges audio files.
+    - Runs the stages as a pipeline so network and CPU work for different quotes overlap.
 
     Parameters:
     None
@@ -34,59 +44,43 @@ def generate_audio():
     Returns:
     None
     """
-    today_date = get_today_date()
     st.title("Generate Audio from Quote")
 
     with st.form("quote_form"):
         num_quotes = st.number_input("Enter the number of quotes to generate:", min_value=1, max_value=10, value=1)
+        tts_workers = st.number_input("Parallel TTS sessions:", min_value=1, max_value=DRIVER_POOL_MAX_SIZE, value=TTS_WORKERS)
         generate_audio_button = st.form_submit_button("Generate Audio")
 
     if generate_audio_button:
-        driver = init_driver()
+        # Fill the quote buffer with one batch request instead of one request per quote
+        get_quote_buffer().prefetch(num_quotes)
+
+        progress_bars = []
         for i in range(num_quotes):
             st.write(f"Generating audio for quote {i + 1}...")
-            progress = st.progress(0)
-
-            quote, author = get_quote()
-            if not quote or not author:
-                st.error(f"Failed to fetch quote {i + 1}.")
-                progress.progress(1.0)
-                continue
-
-            hindi_quote = translate_to_hindi(quote)
-            tts_text = f'{author} says "{quote}"\nहिंदी में\n"{hindi_quote}"'
-
-            audio_data = get_audio_data(tts_text, driver)
-            if not audio_data:
-                st.error(f"Failed to generate audio for quote {i + 1}.")
-                progress.progress(1.0)
-                continue
-
-            # Safe file name for audio file
-            safe_author_name = author.replace(" ", "_").replace(",", "").replace(".", "")
-            tts_audio_path = f"{safe_author_name}_{today_date}_tts_audio.mp3"
-            save_audio_to_mp3(audio_data, tts_audio_path)
-
-            # Save audio metadata (quote and author)
-            audio_metadata = {
-                tts_audio_path: {
-                    "quote": quote,
-                    "author": author,
-                    "hindi_quote": hindi_quote,
-                    "tts_text": tts_text
-                }
-            }
-            save_audio_metadata(audio_metadata)
+            progress_bars.append(st.progress(0))
 
-            final_audio_path = merge_audio(tts_audio_path)
-            if not final_audio_path:
-                st.error(f"Failed to merge audio for quote {i + 1}.")
-                progress.progress(1.0)
-                continue
+        failure_messages = {
+            "quote": "Failed to fetch quote {}.",
+            "translate": "Failed to translate quote {}.",
+            "tts": "Failed to generate audio for quote {}.",
+            "metadata": "Failed to save metadata for quote {}.",
+            "merge": "Failed to merge audio for quote {}.",
+        }
+        pipeline = build_audio_pipeline(tts_workers=tts_workers)
+        stage_names = [stage.name for stage in pipeline.stages]
 
-            st.success(f"Audio for Quote {i + 1} generated successfully.")
-            progress.progress(1.0)
-        driver.quit()
+        for event in pipeline.run([{} for _ in range(num_quotes)]):
+            i = event["index"]
+            if event["status"] == "done":
+                progress_bars[i].progress((stage_names.index(event["stage"]) + 1) / len(stage_names))
+            elif event["status"] == "failed":
+                print(f"Quote {i + 1} failed in stage {event['stage']}: {event['error']}")
+                st.error(failure_messages[event["stage"]].format(i + 1))
+                progress_bars[i].progress(1.0)
+            elif event["status"] == "completed":
+                st.success(f"Audio for Quote {i + 1} generated successfully.")
+                progress_bars[i].progress(1.0)
 
 
 
@@ -99,8 +93,9 @@ def generate_video():
     - Allows selection of audio and video files.
     - Collects video details (title, description, hashtags).
     - Combines selected audio and video into a final video.
-    - Saves video metadata.
-    - Deletes temporary audio files after video generation.
+    - Optionally renders several output formats (9:16, 1:1, 16:9) from one decode pass.
+    - Saves video metadata, one entry per rendered file.
+    - Deletes the selected audio's TTS file after video generation.
 
     Parameters:
     None
@@ -112,8 +107,8 @@ def generate_video():
     st.title("Generate Video with Audio")
 
     # Fetch available audio and video files
-    audio_files = [f for f in os.listdir("output/audios") if f.endswith(".mp3")]
-    video_files = [f for f in os.listdir("videos") if f.endswith(".mp4")]
+    audio_files = list_final_audio("output/audios")
+    video_files = get_template_catalog().names("videos", ".mp4")
 
     if audio_files:
         selected_audio = st.selectbox("Select an Audio File", audio_files)
@@ -127,6 +122,12 @@ def generate_video():
         st.error("No video files found!")
         return
 
+    selected_formats = st.multiselect(
+        "Output formats", list(RENDER_PROFILES),
+        format_func=lambda name: f"{name} ({RENDER_PROFILES[name]['aspect']})",
+        help="Leave empty to render one video in the template's own format.",
+    )
+
     # Use session state to hold form data and avoid resetting
     if 'video_details' not in st.session_state:
         st.session_state.video_details = {}
@@ -152,9 +153,6 @@ def generate_video():
                 st.error("Please fill all fields.")
                 return
 
-            # Load existing video metadata
-            metadata = load_video_metadata()
-
             # Create new metadata for the video
             video_metadata = {
                 "title": title,
@@ -177,15 +175,9 @@ def generate_video():
             audio_path = os.path.join("output", "audios", selected_audio)
             video_file_path = os.path.join("videos", selected_video)
 
-            # Load audio metadata to extract captions text
-            with open("audio_metadata.json", "r") as f:
-                audio_metadata = json.load(f)
-
             # Retrieve the TTS text (captions) for the selected audio
-            captions_texts = []
-            for audio_file, metadata in audio_metadata.items():
-                if selected_audio in audio_file:
-                    captions_texts.append(metadata["tts_text"])
+            audio_record = find_audio_metadata(audio_path)
+            captions_texts = [audio_record["tts_text"]] if audio_record and audio_record.get("tts_text") else []
 
             # Debug: Check paths and captions
             st.write(f"Audio path: {audio_path}")
@@ -193,28 +185,74 @@ def generate_video():
             st.write(f"Final video path: {video_path}")
             st.write(f"Captions: {captions_texts}")
 
-            try:
-                # Create the final video with synchronized captions
-                video_path_final = create_video_with_audio(video_file_path, audio_path, video_path, captions_texts)
-
-                # Save video metadata
-                metadata[video_path_final] = video_metadata
-                save_video_metadata(metadata)
-
-                # Show success message and display the created video
-                st.success(f"Video '{title}' created successfully!")
-                st.video(video_path_final)  # Display the generated video
+            def on_rendered(video_path_final, video_metadata=video_metadata, audio_record=audio_record):
+                # Save video metadata, one entry per rendered format
+                if isinstance(video_path_final, dict):
+                    for profile, path in video_path_final.items():
+                        add_video_metadata(path, dict(
+                            video_metadata, profile=profile, aspect=RENDER_PROFILES[profile]["aspect"]
+                        ))
+                else:
+                    add_video_metadata(video_path_final, video_metadata)
 
-                # Delete any mp3 file in the current directory after video generation
-                for file in os.listdir():
-                    if file.endswith(".mp3"):
-                        os.remove(file)
-                        st.success(f"Successfully deleted the audio file: {file}")
+                # Delete the TTS file behind this mix only; other quotes may still be between TTS and merge
+                tts_audio_path = audio_record.get("tts_audio_path") if audio_record else None
+                if tts_audio_path and os.path.exists(tts_audio_path):
+                    os.remove(tts_audio_path)
+                    print(f"Successfully deleted the audio file: {tts_audio_path}")
 
+            try:
+                # Queue the render; a worker process creates the video with synchronized captions
+                job_id = get_render_queue().submit(video_file_path, audio_path, video_path, captions_texts,
+                                                   on_done=on_rendered, profiles=selected_formats or None)
+                st.session_state.setdefault("render_jobs", []).append({"id": job_id, "title": title})
+                st.success(f"Video '{title}' queued for rendering.")
             except Exception as e:
                 st.error(f"Error during video creation: {e}")
                 st.write("Video creation failed, please check logs.")
 
+    show_render_jobs()
+
+
+def show_render_jobs():
+    """
+    Show the render jobs of this session.
+
+    Features:
+    - Displays state and progress of each queued or running render.
+    - Allows cancelling jobs and refreshing their status.
+    - Displays the finished video once a render is done.
+
+    Parameters:
+    None
+
+    Returns:
+    None
+    """
+    jobs = st.session_state.get("render_jobs", [])
+    if not jobs:
+        return
+
+    render_queue = get_render_queue()
+    st.subheader("Render Jobs")
+    st.button("Refresh status")
+    for job in jobs:
+        status = render_queue.status(job["id"])
+        if not status:
+            continue
+        st.write(f"**{job['title']}** — {status['state']}")
+        if status["state"] in ("queued", "running"):
+            st.progress(status["progress"])
+            if st.button(f"Cancel {job['title']}", key=f"cancel_render_{job['id']}"):
+                render_queue.cancel(job["id"])
+                st.warning(f"Cancellation requested for '{job['title']}'.")
+        elif status["state"] == "done":
+            st.success(f"Video '{job['title']}' created successfully!")
+            for output_path in status.get("output_paths", [status["output_path"]]):
+                st.video(output_path)  # Display the generated video
+        elif status["state"] == "failed":
+            st.error(f"Error during video creation: {status['error']}")
+
 
 
 def list_files():
@@ -222,8 +260,9 @@ def list_files():
     List generated audio and video files with options to delete.
 
     Features:
-    - Lists generated audio files with playback and delete options.
-    - Lists generated video files with playback, metadata display, and delete options.
+    - Lists generated audio files with waveform previews, playback, MP3 export and delete options.
+    - Lists generated video files with thumbnails, playback, metadata display, and delete options.
+    - Shows one page of files at a time; players are only loaded for items that are opened.
 
     Parameters:
     None
@@ -242,20 +281,32 @@ def list_files():
     if not os.path.exists("output/videos"):
         os.makedirs("output/videos")
         
-    audio_files = [f for f in os.listdir('output/audios') if f.endswith(".mp3")]
-    video_files = [f for f in os.listdir("output/videos") if f.endswith(".mp4")]
+    audio_files = sorted((f for f in os.listdir('output/audios') if f.endswith(tuple(AUDIO_EXTENSIONS.values()))),
+                         reverse=True)
+    video_files = sorted((f for f in os.listdir("output/videos") if f.endswith(".mp4")), reverse=True)
 
-
-    # Load video metadata from the JSON file
-    video_metadata = load_video_metadata()
+    previews = get_preview_generator()
 
     st.subheader("Generated Audio Files")
     if audio_files:
-        for audio_file in audio_files:
-            # Display audio player for each .mp3 file
+        for audio_file in paginate(audio_files, "audio_files_page"):
             audio_path = os.path.join("output","audios", audio_file)
             st.write(audio_file)
-            st.audio(audio_path, format="audio/mp3")
+            show_preview(previews.get(audio_path), previews.failed(audio_path))
+
+            # Only send the audio to the browser when it is opened
+            if st.checkbox("Play", key=f"play_audio_{audio_file}"):
+                st.audio(audio_path, format=f"audio/{os.path.splitext(audio_file)[1][1:]}")
+
+            # Mixes are lossless; the MP3 is only encoded when someone asks for it
+            mp3_file = os.path.splitext(audio_file)[0] + AUDIO_EXTENSIONS["mp3"]
+            if mp3_file != audio_file and mp3_file not in audio_files:
+                if st.button(f"Export {mp3_file}", key=f"export_audio_{audio_file}"):
+                    try:
+                        export_mp3(audio_path)
+                        st.success(f"Exported {mp3_file}")
+                    except (RuntimeError, OSError) as e:
+                        st.error(f"Failed to export {mp3_file}: {e}")
 
             # Button to delete the audio file
             delete_button = st.button(f"Delete {audio_file}", key=f"delete_audio_{audio_file}")
@@ -269,30 +320,34 @@ def list_files():
 
     st.subheader("Generated Video Files")
     if video_files:
-        for video_file in video_files:
-            # Small preview of the video with custom CSS for size
+        for video_file in paginate(video_files, "video_files_page"):
             video_path = os.path.join("output","videos", video_file)
             st.write(video_file)
-            # Check if the video path exists
-            if os.path.exists(video_path):
-                st.video(video_path)  # Render video using Streamlit's built-in player
-            else:
-                st.error(f"Video file {video_file} not found.")
-
-            # Display metadata for the video
-            metadata = video_metadata.get(video_path, {})
-            if metadata:
-                st.write(f"**Title**: {metadata.get('title', 'N/A')}")
-                st.write(f"**Description**: {metadata.get('description', 'N/A')}")
-                st.write(f"**Hashtags**: {', '.join(metadata.get('hashtags', []))}")
-                st.write(f"**Date Created**: {metadata.get('date_created', 'N/A')}")
-                st.write(f"**Quote**: {video_metadata.get('quote', 'N/A')}")
-                st.write(f"**Author**: {video_metadata.get('author', 'N/A')}")
-                st.write(f"**Hindi Quote**: {video_metadata.get('hindi_quote', 'N/A')}")
-                st.write(f"**TTS Text**: {video_metadata.get('tts_text', 'N/A')}")
-                
-            else:
-                st.write("No metadata available.")
+            show_preview(previews.get(video_path), previews.failed(video_path))
+
+            # Only send the video and its details to the browser when it is opened
+            if st.checkbox("Play and show details", key=f"play_video_{video_file}"):
+                # Check if the video path exists
+                if os.path.exists(video_path):
+                    st.video(video_path)  # Render video using Streamlit's built-in player
+                else:
+                    st.error(f"Video file {video_file} not found.")
+
+                # Display metadata for the video
+                metadata = get_video_metadata(video_path)
+                if metadata:
+                    st.write(f"**Title**: {metadata.get('title', 'N/A')}")
+                    st.write(f"**Description**: {metadata.get('description', 'N/A')}")
+                    st.write(f"**Hashtags**: {', '.join(metadata.get('hashtags', []))}")
+                    st.write(f"**Date Created**: {metadata.get('date_created', 'N/A')}")
+                    if metadata.get("aspect"):
+                        st.write(f"**Format**: {metadata['profile']} ({metadata['aspect']})")
+                    st.write(f"**Quote**: {metadata.get('quote', 'N/A')}")
+                    st.write(f"**Author**: {metadata.get('author', 'N/A')}")
+                    st.write(f"**Hindi Quote**: {metadata.get('hindi_quote', 'N/A')}")
+                    st.write(f"**TTS Text**: {metadata.get('tts_text', 'N/A')}")
+                else:
+                    st.write("No metadata available.")
 
             # Button to delete the video file
             delete_button = st.button(f"Delete {video_file}", key=f"delete_video_{video_file}")
@@ -306,6 +361,47 @@ def list_files():
         st.write("No video files found.")
 
 
+# Function to show one page of a list
+def paginate(items, key):
+    """
+    Show a page selector and return the items on the selected page.
+
+    Parameters:
+    items (list): All items.
+    key (str): Streamlit widget key of the page selector.
+
+    Returns:
+    list: Items on the current page.
+    """
+    pages = max(1, -(-len(items) // FILES_PER_PAGE))
+    # The list can shrink between reruns (deletes), so keep the remembered page in range
+    st.session_state[key] = min(st.session_state.get(key, 1), pages)
+    page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, step=1, key=key)
+    start = (page - 1) * FILES_PER_PAGE
+    st.caption(f"Showing {start + 1}-{min(start + FILES_PER_PAGE, len(items))} of {len(items)}")
+    return items[start:start + FILES_PER_PAGE]
+
+
+# Function to show a cached preview image
+def show_preview(image_path, failed=False):
+    """
+    Show a thumbnail or waveform, or a note while it is being generated or if it failed.
+
+    Parameters:
+    image_path (str): Path of the preview PNG, None if it is not ready.
+    failed (bool): Whether generating the preview failed.
+
+    Returns:
+    None
+    """
+    if image_path:
+        st.image(image_path)
+    elif failed:
+        st.caption("Preview unavailable.")
+    else:
+        st.caption("Preview is being generated...")
+
+
 
 # Function to handle file uploads
 def upload_files():
@@ -315,6 +411,8 @@ def upload_files():
     Features:
     - Allows uploading of audio files (MP3).
     - Allows uploading of video files (MP4).
+    - Transcodes each upload to the canonical template profile and indexes it, so renders skip probing.
+    - Streams uploads to disk and skips files whose content is already stored.
 
     Parameters:
     None
@@ -330,10 +428,7 @@ def upload_files():
 
     if audio_files:
         for audio_file in audio_files:
-            file_path = os.path.join( "audios", audio_file.name)
-            with open(file_path, "wb") as f:
-                f.write(audio_file.read())
-            st.success(f"Uploaded audio: {audio_file.name}")
+            save_template_upload(audio_file, "audio")
 
     # Upload video files
     st.subheader("Upload Video Templates")
@@ -341,47 +436,68 @@ def upload_files():
 
     if video_files:
         for video_file in video_files:
-            file_path = os.path.join("videos", video_file.name)
-            with open(file_path, "wb") as f:
-                f.write(video_file.read())
-            st.success(f"Uploaded video: {video_file.name}")
+            save_template_upload(video_file, "video")
 
-# Function to list audio templates with search functionality
-def list_audio_templates():
+# Function to store one uploaded template in the canonical profile
+def save_template_upload(uploaded_file, kind):
     """
-    List audio templates with search functionality.
+    Save an uploaded template and normalize it.
 
     Features:
-    - Lists audio templates with playback and delete options.
-    - Provides a search bar to filter audio files.
+    - Streams the upload to disk in chunks and stores it under an atomic rename.
+    - Reuses the existing template when the same file was uploaded before.
+    - Skips files that were already handled during this session (Streamlit reruns the page).
 
     Parameters:
-    None
+    uploaded_file (UploadedFile): File from st.file_uploader.
+    kind (str): "audio" or "video".
 
     Returns:
     None
     """
-    st.title("List Audio Templates")
+    handled = st.session_state.setdefault("ingested_uploads", set())
+    upload_key = (uploaded_file.name, uploaded_file.size)
+    if upload_key in handled:
+        return
 
-    # Search bar for filtering audio files
-    search_query = st.text_input("Search Audio Templates", placeholder="Type to search audio files...")
+    uploaded_file.seek(0)
+    with st.spinner(f"Storing {uploaded_file.name}..."):
+        file_path, status = store_template_upload(uploaded_file, uploaded_file.name, kind)
+    handled.add(upload_key)
+    if status == "existing":
+        st.info(f"{uploaded_file.name} was already uploaded as {os.path.basename(file_path)}.")
+        return
+    if os.path.splitext(os.path.basename(file_path))[0] != os.path.splitext(uploaded_file.name)[0]:
+        st.info(f"A different {kind} template is named {uploaded_file.name}, "
+                f"stored this one as {os.path.basename(file_path)}.")
+    if status == "stored":
+        st.warning(f"Could not normalize {uploaded_file.name}, stored it as uploaded.")
+    st.success(f"Uploaded {kind}: {os.path.basename(file_path)}")
 
-    # List audio templates
-    # if audios folder does not exist, create it
-    if not os.path.exists("audios"):
-        os.makedirs("audios")
+# Function to list audio templates with search functionality
+def list_audio_templates():
+    """
+    List audio templates with search functionality.
 
-    audio_files = [f for f in os.listdir("audios") if f.endswith(".mp3")]
+    Features:
+    - Lists audio templates with duration, size, tags, playback and delete options.
+    - Provides a search bar (prefix and fuzzy matching on names and tags) and sorting.
 
+    Parameters:
+    None
 
+    Returns:
+    None
+    """
+    st.title("List Audio Templates")
 
-    if search_query:
-        audio_files = [f for f in audio_files if search_query.lower() in f.lower()]
+    audio_templates = search_templates(".mp3", "Audio")
 
-    if audio_files:
-        for audio_file in audio_files:
-            audio_path = os.path.join("audios", audio_file)
-            st.write(audio_file)
+    if audio_templates:
+        for template in audio_templates:
+            audio_file = template["name"]
+            audio_path = template["path"]
+            show_template_details(template)
             st.audio(audio_path, format="audio/mp3")
 
             delete_button = st.button(f"Delete {audio_file}", key=f"delete_audio_{audio_file}")
@@ -400,8 +516,8 @@ def list_video_templates():
     List video templates with search functionality.
 
     Features:
-    - Lists video templates with playback and delete options.
-    - Provides a search bar to filter video files.
+    - Lists video templates with duration, size, tags, playback and delete options.
+    - Provides a search bar (prefix and fuzzy matching on names and tags) and sorting.
 
     Parameters:
     None
@@ -411,21 +527,13 @@ def list_video_templates():
     """
     st.title("List Video Templates")
 
-    # Search bar for filtering video files
-    search_query = st.text_input("Search Video Templates", placeholder="Type to search video files...")
-
-    # List video templates
-    # if videos folder does not exist, create it
-    if not os.path.exists("videos"):
-        os.makedirs("videos")
-    video_files = [f for f in os.listdir("videos") if f.endswith(".mp4")]
-    if search_query:
-        video_files = [f for f in video_files if search_query.lower() in f.lower()]
+    video_templates = search_templates(".mp4", "Video")
 
-    if video_files:
-        for video_file in video_files:
-            video_path = os.path.join("videos", video_file)
-            st.write(video_file)
+    if video_templates:
+        for template in video_templates:
+            video_file = template["name"]
+            video_path = template["path"]
+            show_template_details(template)
             st.video(video_path)
 
             delete_button = st.button(f"Delete {video_file}", key=f"delete_video_{video_file}")
@@ -436,3 +544,113 @@ def list_video_templates():
                     st.error(f"Failed to delete video: {video_file}")
     else:
         st.write("No video templates available.")
+
+
+# Function to search the template catalog
+def search_templates(extension, label):
+    """
+    Show the search and sort controls for templates and return the matches.
+
+    Parameters:
+    extension (str): File extension of the templates (".mp3" or ".mp4").
+    label (str): "Audio" or "Video", used in the widget labels.
+
+    Returns:
+    list: Matching catalog entries.
+    """
+    search_query = st.text_input(
+        f"Search {label} Templates", placeholder=f"Type to search {label.lower()} files by name or tag..."
+    )
+    sort_column, order_column = st.columns(2)
+    sort = sort_column.selectbox(
+        "Sort by", ["relevance", "name", "duration", "size", "modified"], key=f"sort_{extension}"
+    )
+    descending = order_column.checkbox("Descending", key=f"descending_{extension}")
+    return get_template_catalog().entries(extension, query=search_query, sort=sort, descending=descending)
+
+
+# Function to show a template's details and tag editor
+def show_template_details(template):
+    """
+    Show a template's name, duration and size, and let the user edit its tags.
+
+    Parameters:
+    template (dict): Catalog entry.
+
+    Returns:
+    None
+    """
+    st.write(template["name"])
+    st.caption(f"{template['duration']:.1f} s · {template['size'] / (1024 * 1024):.1f} MB")
+    key = f"tags_{template['path']}"
+    st.text_input(
+        "Tags (comma separated)", value=", ".join(template["tags"]), key=key,
+        on_change=lambda: get_template_catalog().set_tags(template["path"], st.session_state[key].split(",")),
+    )
+
+
+# Function to show per-stage timings from the trace log
+def performance_page():
+    """
+    Show where the time goes, per stage, over recent runs.
+
+    Features:
+    - Reads the most recent spans from the rotating trace log.
+    - Lists count, error count, p50, p95 and max seconds, bytes, retries and peak RSS per stage or function.
+    - Lists the slowest recent spans with their attributes.
+
+    Parameters:
+    None
+
+    Returns:
+    None
+    """
+    st.title("Performance")
+
+    limit = st.number_input("Recent spans to include", min_value=100, max_value=TRACE_RECENT_SPANS,
+                            value=TRACE_RECENT_SPANS, step=100)
+    spans = load_spans(int(limit))
+    if not spans:
+        st.write("No traces recorded yet. Generate some audio or video first.")
+        return
+
+    stages_only = st.checkbox("Pipeline stages only", value=False)
+    if stages_only:
+        spans = [record for record in spans if str(record.get("span", "")).startswith("stage.")]
+
+    rows = stage_percentiles(spans)
+    st.caption(f"{len(spans)} spans since {datetime.fromtimestamp(spans[0].get('start', 0)):%Y-%m-%d %H:%M}")
+    st.dataframe(
+        [
+            {
+                "Stage": row["stage"],
+                "Calls": row["count"],
+                "Errors": row["errors"],
+                "p50 (s)": round(row["p50"], 3) if row["p50"] is not None else None,
+                "p95 (s)": round(row["p95"], 3) if row["p95"] is not None else None,
+                "Max (s)": round(row["max"], 3) if row["max"] is not None else None,
+                "Total (s)": round(row["total"], 1),
+                "Bytes": row["bytes"],
+                "Retries": row["retries"],
+                "Peak RSS (MB)": row["peak_rss_mb"],
+            }
+            for row in rows
+        ],
+        use_container_width=True,
+    )
+
+    st.subheader("Slowest recent spans")
+    slowest = sorted(spans, key=lambda record: record.get("duration", 0), reverse=True)[:20]
+    st.dataframe(
+        [
+            {
+                "Span": record.get("span"),
+                "Seconds": record.get("duration"),
+                "Status": record.get("status"),
+                "Started": f"{datetime.fromtimestamp(record.get('start', 0)):%Y-%m-%d %H:%M:%S}",
+                "Details": ", ".join(f"{key}={value}" for key, value in record.items() if key not in TRACE_BASE_FIELDS),
+            }
+            for record in slowest
+        ],
+        use_container_width=True,
+    )
@@ -0,0 +1,499 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+
+TEMPLATE_INDEX_FILE = "template_index.json"
+TEMPLATE_WIDTH = 1080
+TEMPLATE_HEIGHT = 1920
+TEMPLATE_FPS = 30
+TEMPLATE_KEYFRAME_INTERVAL = 30  # frames between keyframes (one second)
+TEMPLATE_SAMPLE_RATE = 44100
+TEMPLATE_CHANNELS = 2
+TEMPLATE_PROFILE = f"{TEMPLATE_WIDTH}x{TEMPLATE_HEIGHT}@{TEMPLATE_FPS}-g{TEMPLATE_KEYFRAME_INTERVAL}-{TEMPLATE_SAMPLE_RATE}x{TEMPLATE_CHANNELS}"
+TEMPLATE_DIRECTORIES = {".mp3": "audios", ".mp4": "videos"}
+FUZZY_MATCH_CUTOFF = 0.6  # minimum similarity for a fuzzy search hit
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_NAME_HASH_LENGTH = 8  # hex digits of the content hash added to a name that is already taken
+TEMPLATE_EXTENSIONS = {"audio": ".mp3", "video": ".mp4"}
+
+_index_lock = threading.Lock()
+
+
+def load_template_index():
+    """
+    Load the template sidecar index.
+
+    Returns:
+    dict: Template path → recorded properties.
+    """
+    if not os.path.exists(TEMPLATE_INDEX_FILE):
+        return {}
+    with open(TEMPLATE_INDEX_FILE, "r") as f:
+        return json.load(f)
+
+
+def update_template_index(path, record):
+    """
+    Add or replace one template's record in the sidecar index.
+
+    Features:
+    - Writes the index atomically so readers never see a partial file.
+
+    Parameters:
+    path (str): Template path.
+    record (dict): Properties to store, or None to remove the entry.
+
+    Returns:
+    None
+    """
+    update_template_index_records({path: record})
+
+
+def update_template_index_records(records):
+    """
+    Add, replace or remove several records of the sidecar index in one write.
+
+    Parameters:
+    records (dict): Template path → properties, or None to remove the entry.
+
+    Returns:
+    None
+    """
+    with _index_lock:
+        index = load_template_index()
+        for path, record in records.items():
+            if record is None:
+                index.pop(path, None)
+            else:
+                index[path] = record
+        tmp_path = f"{TEMPLATE_INDEX_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, TEMPLATE_INDEX_FILE)
+
+
+def get_template_info(path):
+    """
+    Get the recorded properties of a template without probing it.
+
+    Features:
+    - Ignores records whose size or modification time no longer match the file.
+
+    Parameters:
+    path (str): Template path.
+
+    Returns:
+    dict: Recorded properties, or None if the template is not indexed or changed.
+    """
+    record = load_template_index().get(path)
+    if not record or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return record
+
+
+def measure_loudness(path):
+    """
+    Measure the integrated loudness of a file's audio.
+
+    Parameters:
+    path (str): Path to the media file.
+
+    Returns:
+    float: Integrated loudness in LUFS, or None if it cannot be measured.
+    """
+    from functions import get_ffmpeg_binary
+
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-nostats", "-i", path, "-vn",
+         "-af", "loudnorm=print_format=json", "-f", "null", "-"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", result.stderr.decode(errors="replace"))
+    if result.returncode != 0 or not match:
+        return None
+    try:
+        return float(json.loads(match.group(0))["input_i"])
+    except (KeyError, ValueError):
+        return None
+
+
+def describe_template(path, loudness=True):
+    """
+    Probe a template once and build its index record.
+
+    Parameters:
+    path (str): Template path.
+    loudness (bool): Also measure loudness, which decodes the whole file.
+
+    Returns:
+    dict: Duration, size, resolution, frame rate, audio format and loudness.
+    """
+    from functions import probe_media
+
+    info = probe_media(path)
+    stat = os.stat(path)
+    record = {
+        "duration": float(info["format"].get("duration", 0)),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "loudness": measure_loudness(path) if loudness else None,
+    }
+    for stream in info["streams"]:
+        if stream["codec_type"] == "video" and "width" not in record:
+            numerator, _, denominator = stream.get("avg_frame_rate", "0/1").partition("/")
+            denominator = float(denominator or 1)
+            record.update(
+                video_codec=stream.get("codec_name"),
+                width=int(stream["width"]),
+                height=int(stream["height"]),
+                fps=float(numerator) / denominator if denominator else 0.0,
+            )
+        elif stream["codec_type"] == "audio" and "sample_rate" not in record:
+            record.update(
+                audio_codec=stream.get("codec_name"),
+                sample_rate=int(stream["sample_rate"]),
+                channels=int(stream["channels"]),
+            )
+    return record
+
+
+def ingest_template(src_path, dest_path, kind, source_sha256=None):
+    """
+    Transcode an uploaded template into the canonical profile and index it.
+
+    Features:
+    - Videos: fixed resolution (letterboxed), frame rate, keyframe interval and H.264/AAC.
+    - Audio: fixed sample rate and channel count.
+    - Writes through a temporary file and renames it into place.
+    - Records duration, resolution and loudness in the sidecar index.
+
+    Parameters:
+    src_path (str): Path of the uploaded file.
+    dest_path (str): Final template path.
+    kind (str): "video" or "audio".
+    source_sha256 (str): Hash of the uploaded bytes, recorded to detect duplicate uploads.
+
+    Returns:
+    str: dest_path.
+    """
+    # Imported here because functions reads the template index
+    from functions import get_ffmpeg_binary, run_ffmpeg
+
+    directory, file_name = os.path.split(dest_path)
+    stem, ext = os.path.splitext(file_name)
+    # Hidden so the catalog does not list it while it is being written
+    tmp_path = os.path.join(directory, f".{stem}.ingest{ext}")
+    audio_args = ["-ar", str(TEMPLATE_SAMPLE_RATE), "-ac", str(TEMPLATE_CHANNELS)]
+    if kind == "video":
+        video_filter = (
+            f"scale={TEMPLATE_WIDTH}:{TEMPLATE_HEIGHT}:force_original_aspect_ratio=decrease,"
+            f"pad={TEMPLATE_WIDTH}:{TEMPLATE_HEIGHT}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={TEMPLATE_FPS}"
+        )
+        command = [
+            get_ffmpeg_binary(), "-y", "-v", "error", "-i", src_path,
+            "-vf", video_filter,
+            "-c:v", "libx264", "-preset", "medium", "-crf", "20", "-pix_fmt", "yuv420p",
+            "-g", str(TEMPLATE_KEYFRAME_INTERVAL), "-keyint_min", str(TEMPLATE_KEYFRAME_INTERVAL),
+            "-sc_threshold", "0",
+            "-c:a", "aac",
+        ] + audio_args + ["-movflags", "+faststart", tmp_path]
+    elif kind == "audio":
+        command = [
+            get_ffmpeg_binary(), "-y", "-v", "error", "-i", src_path, "-vn",
+            "-c:a", "libmp3lame", "-b:a", "192k",
+        ] + audio_args + [tmp_path]
+    else:
+        raise ValueError(f"Unknown template kind: {kind}")
+
+    try:
+        run_ffmpeg(command)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    record = describe_template(dest_path)
+    record.update(
+        kind=kind, profile=TEMPLATE_PROFILE, source_sha256=source_sha256,
+        tags=(load_template_index().get(dest_path) or {}).get("tags", []),
+    )
+    update_template_index(dest_path, record)
+    return dest_path
+
+
+def find_template_by_hash(source_sha256):
+    """
+    Find a stored template that was created from the given upload.
+
+    Parameters:
+    source_sha256 (str): SHA-256 of the uploaded bytes.
+
+    Returns:
+    str: Path of the template, or None if no unchanged template has this source hash.
+    """
+    for path, record in load_template_index().items():
+        if record.get("source_sha256") == source_sha256 and get_template_info(path):
+            return path
+    return None
+
+
+def store_template_upload(stream, file_name, kind, directory=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Store an uploaded template without holding it in memory.
+
+    Features:
+    - Copies the upload to a temporary file in fixed-size chunks, hashing it on the way.
+    - Returns the existing template when the same bytes were uploaded before.
+    - Never overwrites a different template with the same name; the upload gets a name with a hash suffix instead.
+    - Normalizes new uploads with ingest_template, which renames the result into place atomically.
+    - Keeps the upload as-is (also renamed atomically) if it cannot be normalized.
+
+    Parameters:
+    stream (file-like): Binary stream of the upload (e.g. a Streamlit UploadedFile).
+    file_name (str): Name of the uploaded file.
+    kind (str): "audio" or "video".
+    directory (str): Template directory, None for the default one of the kind.
+    chunk_size (int): Bytes copied per read.
+
+    Returns:
+    tuple: (template path, status) with status "existing", "normalized" or "stored".
+        The path's name differs from file_name when that name was taken.
+    """
+    directory = directory or TEMPLATE_DIRECTORIES[TEMPLATE_EXTENSIONS[kind]]
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    upload_path = os.path.join(directory, f".{os.path.basename(file_name)}.{os.getpid()}.{threading.get_ident()}.upload")
+    try:
+        with open(upload_path, "wb") as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        source_sha256 = digest.hexdigest()
+
+        existing = find_template_by_hash(source_sha256)
+        if existing:
+            return existing, "existing"
+
+        base_name = os.path.splitext(os.path.basename(file_name))[0]
+        dest_path = os.path.join(directory, base_name + TEMPLATE_EXTENSIONS[kind])
+        if os.path.exists(dest_path):
+            # Same name, different bytes (same bytes were found by hash above)
+            suffix = source_sha256[:UPLOAD_NAME_HASH_LENGTH]
+            dest_path = os.path.join(directory, f"{base_name}_{suffix}{TEMPLATE_EXTENSIONS[kind]}")
+            print(f"A different {kind} template is already named {os.path.basename(file_name)}, "
+                  f"storing the upload as {os.path.basename(dest_path)}")
+        try:
+            return ingest_template(upload_path, dest_path, kind, source_sha256), "normalized"
+        except (RuntimeError, OSError) as e:
+            print(f"Could not normalize {file_name}, storing it as uploaded: {e}")
+        os.replace(upload_path, dest_path)
+        try:
+            record = describe_template(dest_path, loudness=False)
+        except (RuntimeError, OSError, KeyError, ValueError):
+            stat = os.stat(dest_path)
+            record = {"duration": 0.0, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        record.update(kind=kind, source_sha256=source_sha256)
+        update_template_index(dest_path, record)
+        return dest_path, "stored"
+    finally:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+
+
+def name_tags(file_name):
+    """
+    Derive search tags from a template's file name.
+
+    Parameters:
+    file_name (str): Template file name.
+
+    Returns:
+    list: Lower-case words of the name, without the extension.
+    """
+    return [word for word in re.split(r"[\W_]+", os.path.splitext(file_name)[0].lower()) if word]
+
+
+def match_score(query, entry):
+    """
+    Score how well a template matches a search query.
+
+    Features:
+    - Prefix matches on the name or a tag rank first, then substring matches, then fuzzy matches.
+
+    Parameters:
+    query (str): Search text.
+    entry (dict): Catalog entry.
+
+    Returns:
+    float: Score between 0 (no match) and 3 (name prefix).
+    """
+    query = query.strip().lower()
+    name = entry["name"].lower()
+    words = name_tags(entry["name"]) + [tag.lower() for tag in entry["tags"]]
+    if name.startswith(query):
+        return 3.0
+    if any(word.startswith(query) for word in words):
+        return 2.5
+    if query in name or any(query in tag.lower() for tag in entry["tags"]):
+        return 2.0
+    best = max(difflib.SequenceMatcher(None, query, word).ratio() for word in words + [name])
+    return best if best >= FUZZY_MATCH_CUTOFF else 0.0
+
+
+class TemplateCatalog:
+    """
+    Process-wide catalog of audio and video templates.
+
+    Features:
+    - Rescans a directory only when its modification time changes (files added, removed or replaced).
+    - Re-reads only the files whose size or modification time changed.
+    - Keeps duration, size and tags per template; durations come from the template index
+      and are probed (and indexed) at most once per file.
+    - Supports prefix, substring and fuzzy search with sorting.
+    """
+
+    def __init__(self):
+        self._directories = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self, directory, extension):
+        os.makedirs(directory, exist_ok=True)
+        mtime = os.stat(directory).st_mtime_ns
+        cached = self._directories.get((directory, extension))
+        if cached and cached["mtime_ns"] == mtime:
+            return cached["entries"]
+
+        previous = cached["entries"] if cached else {}
+        entries = {}
+        with os.scandir(directory) as scan:
+            for item in scan:
+                if item.name.startswith(".") or not item.name.endswith(extension) or not item.is_file():
+                    continue
+                stat = item.stat()
+                entry = previous.get(item.name)
+                if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                    entry = {
+                        "name": item.name,
+                        "path": os.path.join(directory, item.name),
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "duration": None,
+                        "tags": [],
+                    }
+                entries[item.name] = entry
+        self._directories[(directory, extension)] = {"mtime_ns": mtime, "entries": entries}
+        return entries
+
+    def _fill_details(self, entries):
+        missing = [entry for entry in entries if entry["duration"] is None]
+        if not missing:
+            return
+        index = load_template_index()
+        updates = {}
+        for entry in missing:
+            record = index.get(entry["path"])
+            if not record or record.get("size") != entry["size"] or record.get("mtime_ns") != entry["mtime_ns"]:
+                try:
+                    record = dict(describe_template(entry["path"], loudness=False), tags=(record or {}).get("tags", []))
+                except (RuntimeError, OSError, KeyError, ValueError) as e:
+                    print(f"Cannot probe template {entry['path']}: {e}")
+                    record = {"duration": 0.0, "size": entry["size"], "mtime_ns": entry["mtime_ns"]}
+                updates[entry["path"]] = record
+            entry["duration"] = record.get("duration") or 0.0
+            entry["tags"] = record.get("tags", [])
+        if updates:
+            update_template_index_records(updates)
+
+    def names(self, directory, extension):
+        """
+        List the template file names in a directory.
+
+        Parameters:
+        directory (str): Template directory.
+        extension (str): File extension of the templates (e.g. ".mp3").
+
+        Returns:
+        list: Sorted file names.
+        """
+        with self._lock:
+            return sorted(self._refresh(directory, extension))
+
+    def entries(self, extension, directory=None, query="", sort="name", descending=False):
+        """
+        List templates with their details, optionally filtered by a search query.
+
+        Parameters:
+        extension (str): File extension of the templates (".mp3" or ".mp4").
+        directory (str): Template directory, None for the default one of the extension.
+        query (str): Search text; empty lists every template.
+        sort (str): "relevance", "name", "duration", "size" or "modified".
+        descending (bool): Reverse the sort order.
+
+        Returns:
+        list: Entries with name, path, size, mtime_ns, duration and tags.
+        """
+        directory = directory or TEMPLATE_DIRECTORIES[extension]
+        with self._lock:
+            entries = list(self._refresh(directory, extension).values())
+            self._fill_details(entries)
+            entries = [dict(entry) for entry in entries]
+
+        if query and query.strip():
+            scored = [(match_score(query, entry), entry) for entry in entries]
+            entries = [entry for score, entry in scored if score > 0]
+            scores = {entry["path"]: score for score, entry in scored}
+        if sort == "relevance" and query and query.strip():
+            entries.sort(key=lambda entry: (-scores[entry["path"]], entry["name"].lower()))
+        else:
+            key = {"duration": "duration", "size": "size", "modified": "mtime_ns"}.get(sort)
+            entries.sort(key=lambda entry: (entry[key], entry["name"].lower()) if key else entry["name"].lower(),
+                         reverse=descending)
+        return entries
+
+    def set_tags(self, path, tags):
+        """
+        Store the tags of a template.
+
+        Parameters:
+        path (str): Template path.
+        tags (list): Tags to store.
+
+        Returns:
+        None
+        """
+        tags = sorted({tag.strip().lower() for tag in tags if tag.strip()})
+        with self._lock:
+            record = dict(load_template_index().get(path) or {}, tags=tags)
+            update_template_index(path, record)
+            for cached in self._directories.values():
+                entry = cached["entries"].get(os.path.basename(path))
+                if entry and entry["path"] == path:
+                    entry["tags"] = tags
+
+
+_template_catalog = None
+_template_catalog_lock = threading.Lock()
+
+
+def get_template_catalog():
+    """
+    Get the process-wide template catalog.
+
+    Returns:
+    TemplateCatalog: Shared template catalog instance.
+    """
+    global _template_catalog
+    with _template_catalog_lock:
+        if _template_catalog is None:
+            _template_catalog = TemplateCatalog()
+        return _template_catalog
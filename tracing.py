@@ -0,0 +1,336 @@
+import functools
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+TRACE_LOG_DIR = "logs"
+TRACE_LOG_PATTERN = "traces.{pid}.jsonl"  # one log per process; rotation is not safe across processes
+TRACE_LOG_MAX_BYTES = 5 * 1024 * 1024
+TRACE_LOG_BACKUPS = 3
+TRACE_LOG_MAX_PROCESSES = 50  # per-process logs kept; the oldest are deleted when a process starts logging
+TRACE_RECENT_SPANS = 5000  # spans read back for the performance page
+
+_trace_logger = None
+_trace_logger_pid = None
+_trace_logger_lock = threading.Lock()
+_local = threading.local()
+
+
+class Span:
+    """
+    One timed operation.
+
+    Features:
+    - Holds free-form attributes (e.g. bytes, retries, cache_hit) written with the span.
+    - add() accumulates counters such as retries across several calls.
+
+    Parameters:
+    name (str): Span name, usually the traced function's name.
+    parent (Span): Enclosing span on the same thread, None for a root span.
+    attributes (dict): Initial attributes.
+    """
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.root = parent.root if parent else self.id
+        self.attributes = dict(attributes or {})
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+
+def _span_stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span():
+    """
+    Get the innermost open span of the calling thread.
+
+    Returns:
+    Span: The open span, or a detached span that is never written when none is open.
+    """
+    stack = _span_stack()
+    return stack[-1] if stack else Span(None)
+
+
+def peak_rss_mb():
+    """
+    Read the peak resident set size of this process and of its finished children (e.g. ffmpeg).
+
+    Returns:
+    tuple: (process MB, children MB), or (None, None) where the platform cannot tell.
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+
+def trace_log_files(log_dir=TRACE_LOG_DIR):
+    """
+    List the per-process trace logs in a directory.
+
+    Parameters:
+    log_dir (str): Trace log directory.
+
+    Returns:
+    list: Paths of the current logs (without rotated backups), oldest first.
+    """
+    paths = glob.glob(os.path.join(log_dir, TRACE_LOG_PATTERN.format(pid="*")))
+    return sorted(paths, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+
+
+def prune_trace_logs(log_dir=TRACE_LOG_DIR, keep=TRACE_LOG_MAX_PROCESSES):
+    """
+    Delete the oldest per-process trace logs and their backups.
+
+    Parameters:
+    log_dir (str): Trace log directory.
+    keep (int): Number of per-process logs to keep.
+
+    Returns:
+    None
+    """
+    paths = trace_log_files(log_dir)
+    for path in paths[:max(0, len(paths) - keep)]:
+        for old in [path] + [f"{path}.{n}" for n in range(1, TRACE_LOG_BACKUPS + 1)]:
+            try:
+                os.remove(old)
+            except OSError:
+                continue  # already gone, or removed by another process pruning at the same time
+
+
+def get_trace_logger():
+    """
+    Get the logger that writes this process's spans to its own rotating JSON-lines trace log.
+
+    Features:
+    - Every process (the app, pipeline workers, render workers) writes logs/traces.<pid>.jsonl,
+      so no two processes ever rotate the same file.
+
+    Returns:
+    logging.Logger: Trace logger.
+    """
+    global _trace_logger, _trace_logger_pid
+    with _trace_logger_lock:
+        if _trace_logger is None or _trace_logger_pid != os.getpid():
+            os.makedirs(TRACE_LOG_DIR, exist_ok=True)
+            prune_trace_logs(keep=TRACE_LOG_MAX_PROCESSES - 1)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(TRACE_LOG_DIR, TRACE_LOG_PATTERN.format(pid=os.getpid())),
+                maxBytes=TRACE_LOG_MAX_BYTES, backupCount=TRACE_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"quotomation.traces.{os.getpid()}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _trace_logger = logger
+            _trace_logger_pid = os.getpid()
+        return _trace_logger
+
+
+def write_span(record):
+    """
+    Append one span record to the trace log.
+
+    Features:
+    - Never raises; a failing trace log must not fail the traced operation.
+
+    Parameters:
+    record (dict): JSON-serializable span record.
+
+    Returns:
+    None
+    """
+    try:
+        get_trace_logger().info(json.dumps(record, default=str, ensure_ascii=False))
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Could not write trace span: {e}")
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block of code as a span.
+
+    Features:
+    - Records duration, status, error, peak RSS, pid and thread, plus the span's attributes.
+    - Nests: spans opened inside it on the same thread record it as their parent and share its root.
+    - A traced block can mark a soft failure with span.set(status="failed").
+
+    Parameters:
+    name (str): Span name.
+    **attributes: Initial attributes of the span.
+
+    Returns:
+    Span: The open span, for adding attributes.
+    """
+    stack = _span_stack()
+    current = Span(name, stack[-1] if stack else None, attributes)
+    stack.append(current)
+    started = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        if stack and stack[-1] is current:
+            stack.pop()
+        own_rss, children_rss = peak_rss_mb()
+        record = {
+            "span": name,
+            "id": current.id,
+            "parent": current.parent.id if current.parent else None,
+            "root": current.root,
+            "start": round(started, 3),
+            "duration": round(duration, 6),
+            "status": "error" if error is not None else current.attributes.pop("status", "ok"),
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+            "peak_rss_mb": own_rss,
+            "children_peak_rss_mb": children_rss,
+        }
+        if error is not None:
+            current.attributes.pop("status", None)
+            record["error"] = f"{error.__class__.__name__}: {error}"
+        record.update(current.attributes)
+        write_span(record)
+
+
+def traced(name=None):
+    """
+    Decorator running every call of a function inside a span.
+
+    Features:
+    - The span is named after the function unless a name is given.
+    - The wrapped function keeps its name, so it can still be pickled for process pools.
+
+    Parameters:
+    name (str): Span name (default is the function's name).
+
+    Returns:
+    callable: Decorator.
+    """
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def load_spans(limit=TRACE_RECENT_SPANS, log_dir=TRACE_LOG_DIR):
+    """
+    Read the most recent spans from all per-process trace logs and their rotated backups.
+
+    Parameters:
+    limit (int): Maximum number of spans to return.
+    log_dir (str): Trace log directory.
+
+    Returns:
+    list: Span records of all processes merged, oldest first.
+    """
+    spans = []
+    for log_file in trace_log_files(log_dir):
+        recent = deque(maxlen=limit)
+        paths = [f"{log_file}.{n}" for n in range(TRACE_LOG_BACKUPS, 0, -1)] + [log_file]
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            recent.append(json.loads(line))
+                        except ValueError:
+                            continue  # a line cut short by a crash
+            except FileNotFoundError:
+                continue
+        spans.extend(recent)
+    spans.sort(key=lambda record: record.get("start") or 0)
+    return spans[-limit:] if limit else []
+
+
+def percentile(values, fraction):
+    """
+    Compute a percentile of a list of numbers by linear interpolation.
+
+    Parameters:
+    values (list): Numbers, in any order.
+    fraction (float): Percentile as a fraction, e.g. 0.95.
+
+    Returns:
+    float: The percentile, or None for an empty list.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def stage_percentiles(spans):
+    """
+    Summarize spans per name.
+
+    Parameters:
+    spans (list): Span records from load_spans().
+
+    Returns:
+    list: One dict per span name with count, errors, p50, p95, max and total seconds,
+        total bytes and retries, and the highest peak RSS; slowest total first.
+    """
+    groups = {}
+    for record in spans:
+        groups.setdefault(record.get("span"), []).append(record)
+
+    rows = []
+    for name, records in groups.items():
+        durations = [r["duration"] for r in records if isinstance(r.get("duration"), (int, float))]
+        rss = [r["peak_rss_mb"] for r in records if r.get("peak_rss_mb") is not None]
+        rows.append({
+            "stage": name,
+            "count": len(records),
+            "errors": sum(1 for r in records if r.get("status") != "ok"),
+            "p50": percentile(durations, 0.5),
+            "p95": percentile(durations, 0.95),
+            "max": max(durations) if durations else None,
+            "total": sum(durations),
+            "bytes": sum(r.get("bytes") or 0 for r in records),
+            "retries": sum(r.get("retries") or 0 for r in records),
+            "peak_rss_mb": max(rss) if rss else None,
+        })
+    rows.sort(key=lambda row: row["total"], reverse=True)
+    return rows